@@ -0,0 +1,225 @@
+import atexit
+import hashlib
+import json
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+from typing import Callable, Dict, List, Optional
+
+ALERT_OUTBOX_PATH = os.getenv('ALERT_OUTBOX_PATH', os.path.join('Data', 'alert_outbox.sqlite3'))
+ALERT_DEDUPE_WINDOW = float(os.getenv('ALERT_DEDUPE_WINDOW', 600))  # Seconds
+ALERT_MAX_ATTEMPTS = int(os.getenv('ALERT_MAX_ATTEMPTS', 8))
+ALERT_BACKOFF_SECONDS = float(os.getenv('ALERT_BACKOFF_SECONDS', 5))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    ticket_id TEXT PRIMARY KEY,
+    dedupe_key TEXT NOT NULL,
+    message TEXT NOT NULL,
+    triggers TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS alerts_due ON alerts (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS alerts_dedupe ON alerts (dedupe_key, created_at);
+"""
+
+
+def build_alert_email(sender: str, recipient: str, message: str, triggers: List[str]) -> EmailMessage:
+    """Emergency email sent to the configured contact"""
+    msg = EmailMessage()
+    msg['Subject'] = "🚨 CRISIS ALERT - Immediate Action Required"
+    msg['From'] = sender
+    msg['To'] = recipient
+
+    msg.set_content(f"""
+    CRISIS DETECTED IN CHAT:
+
+    User Message:
+    {message}
+
+    Detected Triggers:
+    {", ".join(triggers)}
+
+    Required Action:
+    1. Contact user immediately
+    2. Escalate to mental health professional
+    3. Verify user safety
+    """)
+    return msg
+
+
+class AlertOutbox:
+    """Durable queue of crisis alerts with a background SMTP sender.
+
+    Alerts are written to SQLite before `enqueue()` returns, so they survive
+    restarts. One sender thread keeps a single authenticated SMTP session
+    open, retries failures with exponential backoff and collapses repeated
+    triggers from the same session inside `dedupe_window` seconds.
+    """
+
+    def __init__(self, smtp_config: Dict, recipient: str, db_path: str = ALERT_OUTBOX_PATH,
+                 dedupe_window: float = ALERT_DEDUPE_WINDOW, max_attempts: int = ALERT_MAX_ATTEMPTS,
+                 backoff_seconds: float = ALERT_BACKOFF_SECONDS,
+                 smtp_factory: Callable = smtplib.SMTP, use_starttls: bool = True):
+        self.smtp_config = smtp_config
+        self.recipient = recipient
+        self.dedupe_window = dedupe_window
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.smtp_factory = smtp_factory
+        self.use_starttls = use_starttls
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+
+        self._smtp = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    # Producer side (called from detect_crisis)
+    def enqueue(self, message: str, triggers: List[str], session_id: Optional[str] = None) -> str:
+        """Store an alert and return its ticket id without touching the network"""
+        dedupe_key = session_id or hashlib.sha256(message.strip().encode('utf-8')).hexdigest()
+        now = time.time()
+
+        with self._db_lock, self._db:
+            row = self._db.execute(
+                "SELECT ticket_id FROM alerts WHERE dedupe_key = ? AND created_at >= ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (dedupe_key, now - self.dedupe_window)
+            ).fetchone()
+            if row:
+                return row[0]
+
+            ticket_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO alerts (ticket_id, dedupe_key, message, triggers, created_at, status, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, 'pending', ?)",
+                (ticket_id, dedupe_key, message, json.dumps(triggers, ensure_ascii=False), now, now)
+            )
+
+        self._wakeup.set()
+        return ticket_id
+
+    def status(self, ticket_id: str) -> Optional[Dict]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT status, attempts, last_error, sent_at FROM alerts WHERE ticket_id = ?",
+                (ticket_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'status': row[0], 'attempts': row[1], 'error': row[2], 'sent_at': row[3]}
+
+    # Sender side
+    def start(self) -> "AlertOutbox":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="alert-outbox", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._close_smtp()
+
+    def close(self) -> None:
+        """Stop the sender and release the database connection"""
+        self.stop()
+        with self._db_lock:
+            self._db.close()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            due, next_due = self._due_alerts()
+            for alert in due:
+                self._deliver(alert)
+            if not due:
+                wait = None if next_due is None else max(0.0, next_due - time.time())
+                self._wakeup.wait(wait)
+                self._wakeup.clear()
+
+    def _due_alerts(self):
+        now = time.time()
+        with self._db_lock:
+            due = self._db.execute(
+                "SELECT ticket_id, message, triggers, attempts FROM alerts "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY created_at LIMIT 20",
+                (now,)
+            ).fetchall()
+            next_due = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM alerts WHERE status = 'pending'"
+            ).fetchone()[0]
+        return due, next_due
+
+    def _deliver(self, alert) -> None:
+        ticket_id, message, triggers, attempts = alert
+        try:
+            email = build_alert_email(self.smtp_config['sender'], self.recipient, message, json.loads(triggers))
+            self._connection().send_message(email)
+        except Exception as e:
+            self._close_smtp()
+            attempts += 1
+            status = 'failed' if attempts >= self.max_attempts else 'pending'
+            retry_at = time.time() + self.backoff_seconds * (2 ** (attempts - 1))
+            print(f"Email failed (attempt {attempts}): {str(e)}")
+            with self._db_lock, self._db:
+                self._db.execute(
+                    "UPDATE alerts SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? "
+                    "WHERE ticket_id = ?",
+                    (status, attempts, retry_at, str(e), ticket_id)
+                )
+            return
+
+        with self._db_lock, self._db:
+            self._db.execute(
+                "UPDATE alerts SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL "
+                "WHERE ticket_id = ?",
+                (attempts + 1, time.time(), ticket_id)
+            )
+
+    def _connection(self):
+        """Reuse the authenticated SMTP session while the server keeps it open"""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except Exception:
+                pass
+            self._close_smtp()
+
+        server = self.smtp_factory(
+            host=self.smtp_config['server'],
+            port=self.smtp_config['port'],
+            timeout=10
+        )
+        if self.use_starttls:
+            server.starttls()
+        if self.smtp_config.get('password'):
+            server.login(self.smtp_config['sender'], self.smtp_config['password'])
+        self._smtp = server
+        return server
+
+    def _close_smtp(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
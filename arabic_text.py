@@ -0,0 +1,108 @@
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+# Harakat, Quranic annotation marks and superscript alef
+_DIACRITICS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
+_TATWEEL = "\u0640"
+_LETTER_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي",
+    "ة": "ه",
+})
+
+
+def normalize_arabic(text: str) -> str:
+    """Normalise text for matching: strip diacritics and tatweel, unify alef/ya/ta-marbuta"""
+    text = _DIACRITICS.sub("", text.replace(_TATWEEL, ""))
+    return text.translate(_LETTER_MAP).lower()
+
+
+def load_lexicon(path: str) -> List[str]:
+    """Read one phrase per line, skipping blanks and # comments"""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over normalised phrases.
+
+    Matching costs O(len(text) + matches) regardless of how many phrases
+    were compiled in.
+    """
+
+    def __init__(self, phrases: Iterable[str], word_boundaries: bool = False):
+        self.word_boundaries = word_boundaries
+        self.phrases: List[str] = []
+        self._lengths: List[int] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for phrase in phrases:
+            key = normalize_arabic(phrase)
+            if key:
+                self._add(key, len(self.phrases))
+                self.phrases.append(phrase)
+                self._lengths.append(len(key))
+        self._build_failure_links()
+
+    def _add(self, key: str, index: int) -> None:
+        state = 0
+        for char in key:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(index)
+
+    def _build_failure_links(self) -> None:
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, nxt in self._goto[state].items():
+                pending.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                if self._fail[nxt] == nxt:
+                    self._fail[nxt] = 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str, normalized: bool = False) -> List[Tuple[int, int, str]]:
+        """Return (start, end, phrase) for every match in the normalised text"""
+        if not normalized:
+            text = normalize_arabic(text)
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                end = position + 1
+                start = end - lengths[index]
+                if self.word_boundaries and not _at_word_boundaries(text, start, end):
+                    continue
+                matches.append((start, end, self.phrases[index]))
+        return matches
+
+    def matched_phrases(self, text: str) -> List[str]:
+        """Distinct phrases found in `text`, in order of first appearance"""
+        seen = []
+        for _, _, phrase in self.find_all(text):
+            if phrase not in seen:
+                seen.append(phrase)
+        return seen
+
+
+def _at_word_boundaries(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not before.isalnum() and not after.isalnum()
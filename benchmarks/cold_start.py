@@ -0,0 +1,42 @@
+"""Cold-start cost: lazy import vs eager (import + full model load).
+
+Each measurement runs in a fresh interpreter. Run from the repository root:
+    python -m benchmarks.cold_start --runs 3
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import enegine_2_arabic, stt
+imported = time.perf_counter() - started
+ok = enegine_2_arabic.warmup()
+print(json.dumps({"import": imported, "ready": time.perf_counter() - started, "ok": ok}))
+"""
+
+
+def _measure():
+    out = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = [_measure() for _ in range(args.runs)]
+    imported = min(r["import"] for r in runs)
+    ready = min(r["ready"] for r in runs)
+    print(f"time to serve (lazy import):        {imported:.2f}s")
+    print(f"time to serve (eager, old behavior): {ready:.2f}s")
+    print(f"cold-start saving before first turn: {ready - imported:.2f}s")
+    if not all(r["ok"] for r in runs):
+        print("warning: warmup failed in at least one run")
+
+
+if __name__ == "__main__":
+    main()
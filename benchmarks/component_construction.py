@@ -0,0 +1,43 @@
+"""Per-turn construction vs shared components.
+
+Run from the repository root:
+    python -m benchmarks.component_construction --turns 200
+"""
+import argparse
+import time
+
+import components
+from crisis_detection import CrisisDetectorWithEmail, get_crisis_detector
+from enegine_2_arabic import initialize_gemini, get_gemini
+
+
+def _time_per_call(fn, turns):
+    started = time.perf_counter()
+    for _ in range(turns):
+        fn()
+    return (time.perf_counter() - started) / turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    components.reset()
+    startup = components.startup("crisis_detector", "gemini")
+
+    # The detector opens its alert outbox on the first alert, so building it
+    # here creates no SQLite connection or sender thread
+    rows = [
+        ("crisis_detector", CrisisDetectorWithEmail, get_crisis_detector),
+        ("gemini", initialize_gemini, get_gemini),
+    ]
+    print(f"{'component':<16}{'startup ms':>12}{'per-turn new ms':>18}{'per-turn shared ms':>20}")
+    for name, build, shared in rows:
+        fresh = _time_per_call(build, args.turns)
+        reused = _time_per_call(shared, args.turns)
+        print(f"{name:<16}{startup[name] * 1000:>12.2f}{fresh * 1000:>18.3f}{reused * 1000:>20.4f}")
+
+
+if __name__ == "__main__":
+    main()
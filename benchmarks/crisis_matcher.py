@@ -0,0 +1,60 @@
+"""Substring loop vs compiled PhraseMatcher for crisis detection.
+
+Run from the repository root:
+    python -m benchmarks.crisis_matcher --phrases 3000
+"""
+import argparse
+import random
+import time
+
+from arabic_text import PhraseMatcher, normalize_arabic
+
+_LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+
+
+def _random_word(rng):
+    return "".join(rng.choice(_LETTERS) for _ in range(rng.randint(3, 7)))
+
+
+def _phrases(rng, count):
+    return [" ".join(_random_word(rng) for _ in range(rng.randint(1, 3))) for _ in range(count)]
+
+
+def _substring_loop(phrases, text):
+    text = text.lower()
+    return [phrase for phrase in phrases if phrase in text]
+
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--phrases", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    phrases = _phrases(rng, args.phrases)
+
+    started = time.perf_counter()
+    matcher = PhraseMatcher(phrases)
+    print(f"compiled {len(phrases)} phrases in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"{'words':>8}{'loop ms':>12}{'automaton ms':>15}{'speedup':>10}")
+    for words in (20, 200, 2000):
+        text = " ".join(_random_word(rng) for _ in range(words)) + " " + phrases[-1]
+        normalized = normalize_arabic(text)
+        loop = _best_of(lambda: _substring_loop(phrases, text))
+        automaton = _best_of(lambda: matcher.find_all(normalized, normalized=True))
+        print(f"{words:>8}{loop * 1000:>12.3f}{automaton * 1000:>15.3f}{loop / automaton:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
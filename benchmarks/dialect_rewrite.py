@@ -0,0 +1,64 @@
+"""Replace-per-entry loop vs the single-pass DialectRewriter on long replies.
+
+Run from the repository root:
+    python -m benchmarks.dialect_rewrite --entries 3000 --words 2000
+"""
+import argparse
+import random
+import time
+
+from dialect import DialectRewriter, load_dialect_lexicon
+
+_LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+
+
+def _random_word(rng):
+    return "".join(rng.choice(_LETTERS) for _ in range(rng.randint(3, 7)))
+
+
+def _replace_loop(mapping, text):
+    """The rewriting apply_cultural_adjustment used to do"""
+    for fusha, omani in mapping.items():
+        text = text.replace(fusha, omani)
+    return text
+
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=3000, help="Lexicon size (real entries + random ones)")
+    parser.add_argument("--words", type=int, default=2000, help="Words per reply")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mapping = load_dialect_lexicon()
+    while len(mapping) < args.entries:
+        mapping[_random_word(rng)] = _random_word(rng)
+    sources = list(mapping)
+    text = " ".join(
+        rng.choice(sources) if rng.random() < 0.1 else _random_word(rng) for _ in range(args.words)
+    )
+    rewriter = DialectRewriter(mapping)
+
+    loop = _best_of(lambda: _replace_loop(mapping, text))
+    single = _best_of(lambda: rewriter.rewrite(text))
+    chunks = [text[i:i + 4] for i in range(0, len(text), 4)]  # Token-sized pieces
+    streamed = _best_of(lambda: "".join(rewriter.stream(chunks)))
+
+    print(f"{len(mapping)} entries, {args.words} words ({len(text)} chars)")
+    print(f"replace loop   {loop * 1000:9.2f} ms")
+    print(f"single pass    {single * 1000:9.2f} ms  ({loop / single:.0f}x)")
+    print(f"streamed       {streamed * 1000:9.2f} ms  ({len(chunks)} chunks)")
+
+
+if __name__ == "__main__":
+    main()
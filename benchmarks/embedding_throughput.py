@@ -0,0 +1,93 @@
+"""Embedding throughput and memory: the old HuggingFaceEmbeddings (fp32,
+one query at a time) vs the micro-batched EmbeddingService.
+
+Each configuration runs in a fresh interpreter so memory figures are not
+mixed up. Run from the repository root:
+    python -m benchmarks.embedding_throughput --sentences 256 --threads 8
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+CONFIGS = {
+    "baseline": "HuggingFaceEmbeddings fp32",
+    "torch-fp32": "EmbeddingService torch fp32",
+    "torch-int8": "EmbeddingService torch int8",
+    "onnx-int8": "EmbeddingService ONNX int8",
+}
+
+_PROBE = """
+import json, resource, sys, threading, time
+config, sentences, threads = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+before = rss_mb()
+started = time.perf_counter()
+if config == "baseline":
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from ingest import EMBEDDING_MODEL
+    model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, model_kwargs={"device": "cpu"})
+else:
+    from embedding_service import EmbeddingService
+    backend, quantize = config.split("-")
+    model = EmbeddingService(backend=backend, quantize="none" if quantize == "fp32" else quantize)
+load_seconds = time.perf_counter() - started
+loaded = rss_mb()
+
+words = "أشعر بالقلق والتوتر من الشغل ولا أقدر أنام كيف أرتاح وأقوي علاقتي بالله".split()
+texts = [" ".join(words[(i + j) % len(words)] for j in range(12)) for i in range(sentences)]
+
+started = time.perf_counter()
+model.embed_documents(texts)
+documents_rate = sentences / (time.perf_counter() - started)
+
+# Concurrent turns, each embedding its own query
+per_thread = max(1, sentences // threads)
+def worker(offset):
+    for i in range(per_thread):
+        model.embed_query(texts[(offset + i) % sentences])
+workers = [threading.Thread(target=worker, args=(n * per_thread,)) for n in range(threads)]
+started = time.perf_counter()
+for t in workers: t.start()
+for t in workers: t.join()
+queries_rate = per_thread * threads / (time.perf_counter() - started)
+
+print(json.dumps({"load": load_seconds, "model_mb": loaded - before, "rss_mb": rss_mb(),
+                  "documents": documents_rate, "queries": queries_rate}))
+"""
+
+
+def _measure(config, sentences, threads):
+    out = subprocess.run([sys.executable, "-c", _PROBE, config, str(sentences), str(threads)],
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"error": out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    parser.add_argument("--sentences", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent query threads")
+    args = parser.parse_args()
+
+    print(f"{'config':<28}{'load s':>8}{'model MB':>10}{'RSS MB':>9}{'docs/s':>9}{'queries/s':>11}")
+    for config in args.configs:
+        result = _measure(config, args.sentences, args.threads)
+        if "error" in result:
+            print(f"{CONFIGS[config]:<28}  skipped: {result['error']}")
+            continue
+        print(f"{CONFIGS[config]:<28}{result['load']:>8.1f}{result['model_mb']:>10.0f}{result['rss_mb']:>9.0f}"
+              f"{result['documents']:>9.1f}{result['queries']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
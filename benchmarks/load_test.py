@@ -0,0 +1,107 @@
+"""Simulate N concurrent browser sessions against serving.serve_turn.
+
+LLMs, retrieval and edge-tts are replaced by local stand-ins (see stubs.py).
+Recordings come from --audio-dir (WAV files). A sidecar .txt with the same
+name holds the transcript the stub STT returns. Without a folder, canned
+queries are used. --concurrency and --queue stand in for Gradio's
+default_concurrency_limit and max_size: turns beyond the limit wait, and a
+turn arriving while the queue is full is rejected.
+
+    python -m benchmarks.load_test --sessions 20 --turns 5 --concurrency 4 --queue 8
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import stubs
+
+_CANNED = [
+    "أنا قلقان وايد من الامتحانات",
+    "عندي مشاكل مع زوجي",
+    "ما أقدر أنام بالليل",
+    "كيف أتعامل مع الحزن؟",
+]
+
+
+def _recordings(audio_dir):
+    if not audio_dir:
+        return [(f"canned-{i}.wav", text) for i, text in enumerate(_CANNED)]
+    recordings = []
+    for path in sorted(glob.glob(os.path.join(audio_dir, "*.wav"))):
+        sidecar = os.path.splitext(path)[0] + ".txt"
+        text = open(sidecar, encoding="utf-8").read().strip() if os.path.exists(sidecar) else _CANNED[0]
+        recordings.append((path, text))
+    return recordings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--queue", type=int, default=8)
+    parser.add_argument("--audio-dir")
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.4)
+    parser.add_argument("--strategy", default="serial", choices=["serial", "speculative"])
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Apply the real provider quotas")
+    args = parser.parse_args()
+
+    stubs.install(llm_latency=args.llm_latency, rate_limits=args.keep_rate_limits)
+
+    import enegine_2_arabic
+    import serving
+    from metrics import get_histogram
+
+    enegine_2_arabic.RESPONSE_STRATEGY = args.strategy
+    slots = threading.Semaphore(args.concurrency)
+    admitted = threading.Semaphore(args.concurrency + args.queue)
+    recordings = _recordings(args.audio_dir)
+    transcripts = dict(recordings)
+
+    def fake_transcribe(path):
+        time.sleep(args.stt_latency)
+        return transcripts[path]
+
+    def run_session(index):
+        latencies, rejected = [], 0
+        for turn in range(args.turns):
+            path, _ = recordings[(index + turn) % len(recordings)]
+            if not admitted.acquire(blocking=False):
+                rejected += 1
+                continue
+            started = time.perf_counter()
+            try:
+                with slots:
+                    serving.serve_turn(path, f"load-{index}", transcribe=fake_transcribe)
+                latencies.append(time.perf_counter() - started)
+            finally:
+                admitted.release()
+        return latencies, rejected
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        results = list(pool.map(run_session, range(args.sessions)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(l for session, _ in results for l in session)
+    rejected = sum(r for _, r in results)
+    turns = get_histogram("serve.turn_seconds").summary()  # Processing only, without the wait for a slot
+    print(f"sessions={args.sessions} turns/session={args.turns} concurrency={args.concurrency} queue={args.queue}")
+    print(f"completed={len(latencies)} rejected={rejected} elapsed={elapsed:.2f}s "
+          f"throughput={len(latencies) / elapsed:.2f} turns/s")
+    print(f"turn latency p50={turns['p50']:.3f}s p95={turns['p95']:.3f}s p99={turns['p99']:.3f}s")
+    if latencies:
+        waited = [latencies[int(q * (len(latencies) - 1))] for q in (0.5, 0.95, 0.99)]
+        print(f"with queueing  p50={waited[0]:.3f}s p95={waited[1]:.3f}s p99={waited[2]:.3f}s")
+    cache = enegine_2_arabic.response_cache_report()
+    if cache is not None:
+        print(f"response cache hit rate={cache['hit_rate']:.0%} LLM calls saved={cache['llm_calls_saved']} "
+              f"entries={cache['entries']}")
+
+
+if __name__ == "__main__":
+    main()
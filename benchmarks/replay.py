@@ -0,0 +1,216 @@
+"""Replay a corpus of recorded queries through the turn pipeline, offline.
+
+Crisis detection (with alert emails to a local SMTP sink), respond() with
+its post-processing, and TTS synthesis run unchanged; Groq, Gemini,
+retrieval, embeddings and edge-tts are the stand-ins from stubs.py. Sessions
+replay concurrently, each session's turns in order.
+
+The JSON report (throughput, p50/p95/p99 per stage, peak RSS) can be
+compared with one from another commit:
+
+    python -m benchmarks.replay --repeat 5 --output replay.json
+    python -m benchmarks.replay --repeat 5 --compare replay.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import stubs
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replay_corpus.jsonl")
+
+
+def load_corpus(path):
+    """Turns grouped by session, in recorded order"""
+    sessions = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                turn = json.loads(line)
+                sessions[turn["session"]].append(turn["text"])
+    return dict(sessions)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _peak_rss_mb():
+    """Peak resident memory in MB, or None where neither resource nor psutil is available"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KB on Linux
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    return getattr(memory, "peak_wset", memory.rss) / 1024 / 1024  # Windows reports the peak working set
+
+
+def _stage_summaries(snapshot):
+    """Per-stage latency from the tracing histograms ("span.<stage>.seconds")"""
+    return {
+        name[len("span."):-len(".seconds")]: {key: summary[key] for key in ("count", "p50", "p95", "p99")}
+        for name, summary in sorted(snapshot.items())
+        if name.startswith("span.") and name.endswith(".seconds") and summary["count"]
+    }
+
+
+def _compare(report, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\ncompared with {baseline_path} (commit {baseline.get('commit')})")
+    print(f"{'':<28}{'before':>10}{'after':>10}{'change':>9}")
+
+    def row(label, before, after):
+        if before is None or after is None:
+            return
+        change = f"{(after - before) / before:+.0%}" if before else ""
+        print(f"{label:<28}{before:>10.3f}{after:>10.3f}{change:>9}")
+
+    row("throughput turns/s", baseline["throughput"], report["throughput"])
+    row("peak RSS MB", baseline["peak_rss_mb"], report["peak_rss_mb"])
+    for stage, summary in report["stages"].items():
+        if stage in baseline["stages"]:
+            row(f"{stage} p95 ms", baseline["stages"][stage]["p95"] * 1000, summary["p95"] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL lines of {session, text}")
+    parser.add_argument("--repeat", type=int, default=3, help="Replay the corpus this many times")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed passes before measuring")
+    parser.add_argument("--concurrency", type=int, default=4, help="Sessions replayed at once")
+    parser.add_argument("--strategy", default="serial", choices=["serial", "speculative"])
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--tts-latency", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--response-cache", action="store_true", help="Turn on the semantic response cache")
+    parser.add_argument("--output", help="Write the JSON report here (stdout otherwise)")
+    parser.add_argument("--compare", help="Earlier report to print the differences against")
+    args = parser.parse_args()
+
+    # Crisis alerts go to a local sink, queued in a throwaway outbox
+    sink = stubs.SmtpSink().start()
+    workdir = tempfile.mkdtemp(prefix="replay-")
+    os.environ.update(
+        ALERT_RECIPIENT="counsellor@example.org", SMTP_SENDER="alerts@example.org",
+        SMTP_SERVER="127.0.0.1", SMTP_PORT=str(sink.port), SMTP_STARTTLS="false",
+        ALERT_OUTBOX_PATH=os.path.join(workdir, "alert_outbox.sqlite3"),
+    )
+    if args.response_cache:
+        os.environ["RESPONSE_CACHE"] = "1"
+
+    fakes = stubs.install(llm_latency=args.llm_latency, llm_jitter=args.llm_jitter,
+                          failure_rate=args.failure_rate, tts_latency=args.tts_latency, seed=args.seed)
+
+    import components
+    import enegine_2_arabic
+    import metrics
+    import tracing
+    import tts
+    from crisis_detection import CrisisDetectorWithEmail
+
+    tracing.enable()
+    components.override("crisis_detector", CrisisDetectorWithEmail())
+    detector = components.get("crisis_detector")
+    sessions = load_corpus(args.corpus)
+    tickets = set()  # Alerts queued during the measured runs
+
+    def replay_turn(session_id, text):
+        """True if the turn produced a spoken reply"""
+        with tracing.turn():
+            started = time.perf_counter()
+            is_crisis, details = detector.detect_crisis(text, session_id=session_id)
+            if details.get("alert_ticket"):
+                tickets.add(details["alert_ticket"])
+            try:
+                if is_crisis:
+                    reply = enegine_2_arabic.CRISIS_REPLY
+                else:
+                    reply = enegine_2_arabic.respond(text, None, strategy=args.strategy, session_id=session_id)
+            except Exception:
+                return False  # Primary and fallback both failed (see --failure-rate)
+            with tracing.span("tts"):
+                asyncio.run(tts.synthesize_response(reply))
+            tracing.record("turn", time.perf_counter() - started, started=started)
+            return True
+
+    def replay_session(item, run):
+        session, texts = item
+        answered = sum(replay_turn(f"{session}-{run}", text) for text in texts)
+        return len(texts), len(texts) - answered
+
+    def replay_all(run):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda item: replay_session(item, run), sessions.items()))
+        return sum(turns for turns, _ in results), sum(failed for _, failed in results)
+
+    for run in range(args.warmup):
+        replay_all(f"warmup{run}")
+    metrics.reset()
+    tickets.clear()
+    calls_before = {name: fake.calls for name, fake in fakes.items()}
+
+    started = time.perf_counter()
+    results = [replay_all(run) for run in range(args.repeat)]
+    elapsed = time.perf_counter() - started
+    turns = sum(turns for turns, _ in results)
+
+    # Give the outbox a moment to hand the queued alerts to the sink
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and any(
+            detector.alert_status(ticket)["status"] == "pending" for ticket in tickets):
+        time.sleep(0.05)
+    delivered = sum(detector.alert_status(ticket)["status"] == "sent" for ticket in tickets)
+
+    report = {
+        "commit": _git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "turns": turns,
+        "failed_turns": sum(failed for _, failed in results),
+        "elapsed": elapsed,
+        "throughput": turns / elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": _stage_summaries(metrics.snapshot()),
+        "llm_calls": {name: fake.calls - calls_before[name] for name, fake in fakes.items()},
+        "alerts": {"queued": len(tickets), "delivered": delivered, "received_by_sink": sink.received},
+        "response_cache": enegine_2_arabic.response_cache_report(),
+        "tts_cache": tts.audio_cache.stats(),
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        rss = f"{report['peak_rss_mb']:.0f} MB" if report["peak_rss_mb"] is not None else "n/a"
+        print(f"{turns} turns in {elapsed:.2f}s ({report['throughput']:.2f} turns/s), "
+              f"peak RSS {rss} -> {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    if args.compare:
+        _compare(report, args.compare)
+    sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Retrieval quality and latency: dense vs BM25 vs hybrid (RRF).
+
+Queries come from benchmarks/retrieval_queries.jsonl, each labelled with
+terms from the source PDFs: a retrieved chunk counts as relevant when it
+contains one of them (after Arabic normalisation), so the labels survive
+re-chunking. Needs a store built by ingest.py. Run from the repository root:
+    python -m benchmarks.retrieval_quality --modes dense lexical hybrid --k 4
+"""
+import argparse
+import json
+import os
+import time
+
+from arabic_text import normalize_arabic
+from ingest import VECTOR_DB_PATH, build_embeddings, open_vector_db
+from lexical_index import open_lexical_index
+from metrics import Histogram
+from retrieval_cache import RetrievalCache, build_cached_retriever
+
+QUERIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval_queries.jsonl")
+
+
+def _load_queries(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _first_relevant_rank(documents, terms):
+    terms = [normalize_arabic(term) for term in terms]
+    for rank, document in enumerate(documents, start=1):
+        text = normalize_arabic(document.page_content)
+        if any(term in text for term in terms):
+            return rank
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default=VECTOR_DB_PATH)
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--modes", nargs="+", default=["dense", "lexical", "hybrid"],
+                        choices=["dense", "lexical", "hybrid"])
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    queries = _load_queries(args.queries)
+    lexical = open_lexical_index(args.db)
+    if lexical is None and set(args.modes) & {"lexical", "hybrid"}:
+        parser.error("No lexical index - run ingest.py first")
+
+    started = time.perf_counter()
+    vector_db = open_vector_db(build_embeddings(), args.db) if set(args.modes) & {"dense", "hybrid"} else None
+    if vector_db is not None:
+        print(f"embedding model + store loaded in {time.perf_counter() - started:.1f}s")
+    print(f"{len(queries)} labelled queries, k={args.k}\n")
+
+    print(f"{'mode':<9}{'hit@k':>8}{'MRR':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for mode in args.modes:
+        # Fresh cache per mode, so every query is a real search
+        retriever = build_cached_retriever(vector_db, k=args.k, cache=RetrievalCache(),
+                                           lexical=lexical, mode=mode)
+        latency = Histogram(f"retrieval.{mode}.ms")
+        hits, reciprocal_ranks = 0, 0.0
+        for item in queries:
+            started = time.perf_counter()
+            documents = retriever.invoke(item["query"])
+            latency.observe((time.perf_counter() - started) * 1000)
+            rank = _first_relevant_rank(documents, item["relevant"])
+            if rank:
+                hits += 1
+                reciprocal_ranks += 1.0 / rank
+
+        summary = latency.summary()
+        print(f"{mode:<9}{hits / len(queries):>8.2f}{reciprocal_ranks / len(queries):>8.2f}"
+              f"{summary['p50']:>9.1f}{summary['p95']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""History tokens per turn and store memory as conversations grow.
+
+Run from the repository root:
+    python -m benchmarks.session_window --turns 200 --sessions 100
+"""
+import argparse
+import random
+
+from rate_limiter import estimate_tokens
+from session_store import SessionStore
+
+_USER_TURNS = [
+    "أنا قلقان وايد من الشغل وما أقدر أنام",
+    "عندي توتر مع أهلي وما أعرف شو أسوي",
+    "أحس إني وحيد حتى وأنا بين الناس",
+    "زوجي ما يفهمني والمشاكل تزيد كل يوم",
+    "كيف أقوي علاقتي بالله وأرتاح نفسياً؟",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    store = SessionStore()
+    checkpoints = {1, 5, 10, 25, 50, 100, args.turns}
+
+    print(f"{'turn':>6}{'history tokens':>16}{'store KiB':>12}")
+    for turn in range(1, args.turns + 1):
+        for session in range(args.sessions):
+            user = rng.choice(_USER_TURNS)
+            bot = "الله يعينك، " + " ".join(rng.choice(_USER_TURNS) for _ in range(4))
+            store.record_turn(f"session-{session}", user, bot)
+        if turn in checkpoints:
+            tokens = estimate_tokens(store.history_text("session-0"))
+            print(f"{turn:>6}{tokens:>16}{store.memory_bytes() / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
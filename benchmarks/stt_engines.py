@@ -0,0 +1,72 @@
+"""Per-file latency and real-time factor of the speech-to-text engines.
+
+Real-time factor = decode seconds / audio seconds (below 1 is faster than
+real time). Run from the repository root:
+    python -m benchmarks.stt_engines --wav-dir samples/ --engines local selenium
+"""
+import argparse
+import glob
+import os
+import time
+import wave
+
+from metrics import Histogram
+
+
+def _audio_seconds(path):
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def _build(name, workers):
+    if name == "local":
+        from local_stt import LocalWhisperSTTEngine
+        engine = LocalWhisperSTTEngine(workers=workers)
+    else:
+        from stt import SeleniumSTTEngine
+        engine = SeleniumSTTEngine()
+    engine.warmup()
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--wav-dir", required=True)
+    parser.add_argument("--engines", nargs="+", default=["local"], choices=["local", "selenium"])
+    parser.add_argument("--workers", type=int, default=2, help="Decoder processes for the local engine")
+    parser.add_argument("--show-text", action="store_true")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.wav_dir, "*.wav")))
+    if not paths:
+        parser.error(f"No .wav files in {args.wav_dir}")
+    audio_total = sum(_audio_seconds(path) for path in paths)
+    print(f"{len(paths)} files, {audio_total:.1f}s of audio\n")
+
+    print(f"{'engine':<10}{'p50 s':>8}{'p95 s':>8}{'RTF':>8}{'startup s':>11}")
+    for name in args.engines:
+        started = time.perf_counter()
+        engine = _build(name, args.workers)
+        startup = time.perf_counter() - started
+
+        latency = Histogram(f"stt.{name}.seconds")
+        decode_total = 0.0
+        try:
+            for path in paths:
+                started = time.perf_counter()
+                text = engine.transcribe_file(path)
+                elapsed = time.perf_counter() - started
+                latency.observe(elapsed)
+                decode_total += elapsed
+                if args.show_text:
+                    print(f"  [{name}] {os.path.basename(path)}: {text}")
+        finally:
+            engine.close()
+
+        summary = latency.summary()
+        print(f"{name:<10}{summary['p50']:>8.2f}{summary['p95']:>8.2f}"
+              f"{decode_total / audio_total:>8.2f}{startup:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
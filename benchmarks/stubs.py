@@ -0,0 +1,178 @@
+"""Deterministic local stand-ins for the remote services, for benchmarks.
+
+install() swaps them in through the components registry and by patching
+edge_tts.Communicate, so the production code paths run unchanged.
+SmtpSink accepts the crisis alert emails on localhost.
+"""
+import random
+import socketserver
+import threading
+import time
+import zlib
+
+import components
+
+DEFAULT_REPLY = (
+    "نعم، الله يعينك. جرب تاخذ نفس عميق وتذكر إن بعد العسر يسر. "
+    "حاول تقسم يومك لخطوات صغيرة، وكلم حد تثق فيه عن اللي في خاطرك."
+)
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeChatModel:
+    """Chat model with configurable latency, jitter and failure rate"""
+
+    def __init__(self, reply=DEFAULT_REPLY, latency=0.05, jitter=0.0, failure_rate=0.0, seed=0):
+        self.reply = reply
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay_or_fail(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            failed = self._rng.random() < self.failure_rate
+        time.sleep(delay)
+        if failed:
+            raise RuntimeError("simulated LLM failure")
+
+    def invoke(self, prompt):
+        self._delay_or_fail()
+        return _Message(self.reply)
+
+    def stream(self, prompt):
+        self._delay_or_fail()
+        for word in self.reply.split(" "):
+            yield _Message(word + " ")
+
+
+class _Document:
+    def __init__(self, page_content):
+        self.page_content = page_content
+        self.metadata = {}
+
+
+class FakeRetriever:
+    def __init__(self, chunks=None, latency=0.005):
+        self.chunks = chunks or ["الصبر والدعاء يساعدان على تخفيف القلق.", "التنفس العميق يهدئ الجسم."]
+        self.latency = latency
+
+    def invoke(self, query):
+        time.sleep(self.latency)
+        return [_Document(chunk) for chunk in self.chunks]
+
+
+class FakeEmbeddings:
+    """Hashed character trigrams: queries sharing most of their words land close together"""
+
+    def __init__(self, dimensions=256):
+        self.dimensions = dimensions
+
+    def embed_query(self, text):
+        vector = [0.0] * self.dimensions
+        padded = f" {' '.join(text.split())} "
+        for i in range(len(padded) - 2):
+            vector[zlib.crc32(padded[i:i + 3].encode()) % self.dimensions] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class FakeCommunicate:
+    """edge_tts.Communicate stand-in: ~1 KB of 'audio' per 10 characters"""
+
+    latency = 0.02
+
+    def __init__(self, text, voice=None, **kwargs):
+        self.text = text
+
+    async def stream(self):
+        import asyncio
+        await asyncio.sleep(self.latency)
+        yield {"type": "audio", "data": b"\xff\xfb" * (50 * max(1, len(self.text) // 10))}
+
+    async def save(self, path):
+        with open(path, "wb") as f:
+            async for chunk in self.stream():
+                f.write(chunk["data"])
+
+
+class _SmtpSession(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: no STARTTLS, no AUTH, every message accepted"""
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self._reply("220 sink ready")
+        for raw in self.rfile:
+            command = raw.decode("utf-8", "replace").strip().upper()
+            if command.startswith("EHLO"):
+                self._reply("250-sink")
+                self._reply("250 8BITMIME")
+            elif command == "DATA":
+                self._reply("354 end with <CRLF>.<CRLF>")
+                for line in self.rfile:
+                    if line in (b".\r\n", b".\n"):
+                        break
+                self.server.received += 1
+                self._reply("250 queued")
+            elif command == "QUIT":
+                self._reply("221 bye")
+                return
+            elif command.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 ok")
+            else:
+                self._reply("502 not implemented")
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Local SMTP server that counts the messages it receives"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0):
+        super().__init__(("127.0.0.1", port), _SmtpSession)
+        self.received = 0
+        self.port = self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True).start()
+        return self
+
+
+def install(llm_latency=0.05, llm_jitter=0.0, failure_rate=0.0, tts_latency=0.02, seed=0,
+            rate_limits=False):
+    """Replace Groq, Gemini, the retriever and edge-tts with local stand-ins.
+
+    Provider quotas are lifted unless `rate_limits` is set, so measurements
+    show the pipeline rather than the token buckets.
+    """
+    import edge_tts
+    import enegine_2_arabic
+    from rate_limiter import RateLimiter
+
+    if not rate_limits:
+        enegine_2_arabic.groq_limiter = RateLimiter(1e9, burst=1e9, name="groq")
+        enegine_2_arabic.gemini_limiter = RateLimiter(1e9, burst=1e9, name="gemini")
+
+    primary = FakeChatModel(latency=llm_latency, jitter=llm_jitter, failure_rate=failure_rate, seed=seed)
+    gemini = FakeChatModel(latency=llm_latency, jitter=llm_jitter, failure_rate=failure_rate, seed=seed + 1)
+    components.override("primary_llm", primary)
+    components.override("gemini", gemini)
+    components.override("retriever", FakeRetriever())
+    components.override("embeddings", FakeEmbeddings())  # Only the response cache embeds here
+    enegine_2_arabic.get_postprocessor().reseed(seed)  # Same openers/fillers on every run
+    FakeCommunicate.latency = tts_latency
+    edge_tts.Communicate = FakeCommunicate
+    return {"primary_llm": primary, "gemini": gemini}
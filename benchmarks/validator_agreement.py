@@ -0,0 +1,111 @@
+"""Reply validators on a labelled set: accuracy, agreement and latency.
+
+Compares the local rule validator, the hybrid validator (local rules,
+Gemini for uncertain scores) and, with --gemini, the Gemini-only validator.
+Labels live in validator_labels.jsonl ({query, draft, valid}): `draft` is a
+primary-model answer, labelled on whether it meets the four criteria. Each
+draft goes through the app's own post-processing (academic markers, dialect
+rewrite, openers) exactly as in respond(), so the validators see the reply
+they would see in production. Run from the repository root:
+    python -m benchmarks.validator_agreement            # local rules only, offline
+    python -m benchmarks.validator_agreement --gemini   # also call Gemini (needs GOOGLE_API_KEY)
+"""
+import argparse
+import json
+import os
+import time
+
+from metrics import Histogram
+from validation import EscalatingValidator, RemoteValidator, RuleValidator, VALIDATOR_MARKERS_PATH
+
+DEFAULT_LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "validator_labels.jsonl")
+
+
+def load_labels(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def postprocess(labels, seed=0):
+    """Add the reply respond() would validate for each draft"""
+    from enegine_2_arabic import get_postprocessor
+    postprocessor = get_postprocessor()
+    postprocessor.reseed(seed)
+    for item in labels:
+        item["response"] = postprocessor.process(item["draft"], item["query"], stages=("format", "cultural"))
+    return postprocessor
+
+
+def _run(decide, labels):
+    """Decisions (None = undecided) and a latency histogram"""
+    latency = Histogram("validate")
+    decisions = []
+    for item in labels:
+        started = time.perf_counter()
+        decisions.append(decide(item["query"], item["response"], item["draft"]))
+        latency.observe(time.perf_counter() - started)
+    return decisions, latency
+
+
+def _report(name, decisions, labels, latency, remote_calls):
+    decided = [(d, item["valid"]) for d, item in zip(decisions, labels) if d is not None]
+    correct = sum(d == valid for d, valid in decided)
+    accepted_wrongly = sum(d and not valid for d, valid in decided)
+    summary = latency.summary()
+    accuracy = f"{correct / len(decided):.0%}" if decided else "n/a"
+    print(f"{name:<10}{accuracy:>10}{len(labels) - len(decided):>11}{accepted_wrongly:>10}"
+          f"{summary['p50'] * 1000:>10.2f}{summary['p95'] * 1000:>10.2f}{remote_calls:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--labels", default=DEFAULT_LABELS)
+    parser.add_argument("--gemini", action="store_true", help="Call Gemini for the gemini and hybrid rows")
+    parser.add_argument("--show", action="store_true", help="Print every reply the local rules got wrong")
+    args = parser.parse_args()
+    labels = load_labels(args.labels)
+    postprocessor = postprocess(labels)
+
+    local = RuleValidator(postprocessor.phrases(), VALIDATOR_MARKERS_PATH)
+    remote_calls = {"count": 0}
+    remote = None
+    if args.gemini:
+        from enegine_2_arabic import ask_gemini_validation
+
+        def ask(query, response):
+            remote_calls["count"] += 1
+            return ask_gemini_validation(query, response)
+        remote = RemoteValidator(ask)
+
+    print(f"{len(labels)} labelled replies ({sum(item['valid'] for item in labels)} valid)")
+    print(f"{'validator':<10}{'accuracy':>10}{'undecided':>11}{'false ok':>10}{'p50 ms':>10}{'p95 ms':>10}{'gemini':>8}")
+
+    local_decisions, latency = _run(local.validate, labels)
+    _report("local", local_decisions, labels, latency, 0)
+    # Scoring the rewritten reply instead of the draft: what the rules judged before
+    rewritten, latency = _run(lambda query, response, draft: local.validate(query, response), labels)
+    _report("rewritten", rewritten, labels, latency, 0)
+
+    # Without Gemini the hybrid row shows how many replies it would have escalated
+    hybrid = EscalatingValidator(local, remote or RemoteValidator(lambda query, response: ""))
+    decide = hybrid.validate if remote else hybrid.decide_locally
+    remote_calls["count"] = 0
+    decisions, latency = _run(decide, labels)
+    _report("hybrid", decisions, labels, latency, remote_calls["count"])
+
+    if remote:
+        remote_calls["count"] = 0
+        gemini_decisions, latency = _run(remote.validate, labels)
+        _report("gemini", gemini_decisions, labels, latency, remote_calls["count"])
+        agreement = sum(a == b for a, b in zip(local_decisions, gemini_decisions)) / len(labels)
+        print(f"local/gemini agreement: {agreement:.0%}")
+
+    if args.show:
+        for decision, item in zip(local_decisions, labels):
+            if decision != item["valid"]:
+                print(f"\nlabel={item['valid']} local={decision} score={local.score(item['query'], item['response'], item['draft']):.2f}")
+                print(item["response"])
+
+
+if __name__ == "__main__":
+    main()
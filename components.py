@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import Any, Callable, Dict
+
+# Process-wide registry of expensive shared components (LLM clients, detectors, ...)
+# Each component is built once on first use and then shared by every Gradio worker.
+_factories: Dict[str, Callable[[], Any]] = {}
+_instances: Dict[str, Any] = {}
+_build_seconds: Dict[str, float] = {}
+_build_locks: Dict[str, threading.Lock] = {}
+_lock = threading.RLock()
+
+
+def register(name: str, factory: Callable[[], Any]) -> None:
+    """Declare how to build component `name`; nothing is built yet"""
+    with _lock:
+        _factories[name] = factory
+
+
+def get(name: str) -> Any:
+    """Return the shared instance of `name`, building it on first use"""
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+
+    with _lock:
+        if name not in _factories and name not in _instances:
+            raise KeyError(f"Unknown component: {name}")
+        build_lock = _build_locks.setdefault(name, threading.Lock())
+
+    # One lock per component: a slow model load never blocks unrelated components
+    with build_lock:
+        if name not in _instances:
+            started = time.perf_counter()
+            instance = _factories[name]()
+            with _lock:
+                _instances[name] = instance
+                _build_seconds[name] = time.perf_counter() - started
+        return _instances[name]
+
+
+def is_built(name: str) -> bool:
+    return name in _instances
+
+
+def override(name: str, instance: Any) -> None:
+    """Replace a component with a ready-made instance (benchmarks, stand-ins)"""
+    with _lock:
+        _instances[name] = instance
+        _build_seconds[name] = 0.0
+
+
+def reset(name: str = None) -> None:
+    """Drop built instances so the next get() rebuilds them"""
+    with _lock:
+        if name is None:
+            _instances.clear()
+            _build_seconds.clear()
+        else:
+            _instances.pop(name, None)
+            _build_seconds.pop(name, None)
+
+
+def startup(*names: str) -> Dict[str, float]:
+    """Build the given components (all registered ones by default) up front"""
+    with _lock:
+        names = names or tuple(_factories)
+    for name in names:
+        get(name)
+    return build_times()
+
+
+def build_times() -> Dict[str, float]:
+    """Seconds spent constructing each built component"""
+    with _lock:
+        return dict(_build_seconds)
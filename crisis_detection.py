@@ -1,23 +1,41 @@
-import smtplib
-from email.message import EmailMessage
 import os
+import threading
 from dotenv import load_dotenv
-from typing import Tuple, Dict
+from functools import lru_cache
+from typing import Tuple, Dict, List, Optional
+from arabic_text import PhraseMatcher, load_lexicon
+from alert_outbox import AlertOutbox
+from tracing import span, traced
+import components
 
 # Load environment variables
 load_dotenv()
 
+CRISIS_LEXICON_PATH = os.getenv(
+    'CRISIS_LEXICON_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons', 'crisis_phrases.txt')
+)
+
+
+@lru_cache(maxsize=1)
+def get_crisis_matcher() -> PhraseMatcher:
+    """Crisis lexicon (English + Arabic) compiled into one automaton"""
+    return PhraseMatcher(load_lexicon(CRISIS_LEXICON_PATH))
+
+
+def match_crisis_phrases(text: str) -> List[str]:
+    """Crisis phrases found in `text`; no LLM or network involved"""
+    if not text or not text.strip():
+        return []
+    return get_crisis_matcher().matched_phrases(text)
+
 
 class CrisisDetectorWithEmail:
     def __init__(self):
         """Initialize with guaranteed crisis detection and email alerts"""
         # Crisis phrases (will ALWAYS trigger when matched)
-        self.crisis_phrases = [
-            'kill myself', 'end my life', 'want to die',
-            'suicide', 'end it all', 'die tonight',
-            'take my life', 'don\'t want to live',
-            'better off dead', 'no reason to live'
-        ]
+        self.crisis_matcher = get_crisis_matcher()
+        self.crisis_phrases = self.crisis_matcher.phrases
 
         # Email configuration - verify all values are loaded
         self.alert_recipient = os.getenv('ALERT_RECIPIENT')
@@ -31,87 +49,96 @@ class CrisisDetectorWithEmail:
         # Verify email configuration
         self._verify_email_config()
 
+        # Alerts are queued and sent in the background, never inside the turn.
+        # The outbox (SQLite + sender thread) is only opened when first needed
+        self.alerts_enabled = bool(self.alert_recipient and self.smtp_config['sender'])
+        self._alert_outbox = None
+        self._outbox_lock = threading.Lock()
+
+    @property
+    def alert_outbox(self) -> Optional[AlertOutbox]:
+        """The outbox with its sender running, opened on first use; None if alerts are off"""
+        if self._alert_outbox is None and self.alerts_enabled:
+            with self._outbox_lock:
+                if self._alert_outbox is None:
+                    self._alert_outbox = AlertOutbox(
+                        self.smtp_config,
+                        self.alert_recipient,
+                        use_starttls=os.getenv('SMTP_STARTTLS', 'true').lower() != 'false'
+                    ).start()
+        return self._alert_outbox
+
+    def start_alerts(self) -> bool:
+        """Start the sender now, so alerts left pending by an earlier run go out without waiting for a new one"""
+        return self.alert_outbox is not None
+
+    def close(self) -> None:
+        with self._outbox_lock:
+            outbox, self._alert_outbox = self._alert_outbox, None
+        if outbox is not None:
+            outbox.close()
+
     def _verify_email_config(self):
         """Check if email settings are properly configured"""
         required_keys = ['alert_recipient', 'sender', 'password']
         missing = [key for key in required_keys if not getattr(self, key, None) and not self.smtp_config.get(key)]
 
-        if missing:
+        if missing == ['password']:
+            # Alerts are still queued and sent, without logging in (fine for an open relay)
+            print("⚠️ SMTP_PASSWORD not set - email alerts will be sent without SMTP login")
+            print("Set SMTP_PASSWORD in your .env file if your mail server requires authentication")
+        elif missing:
             print(f"⚠️ Email alert disabled - Missing configuration: {', '.join(missing)}")
             print("Please check your .env file for:")
             print("ALERT_RECIPIENT, SMTP_SENDER, and SMTP_PASSWORD")
         else:
             print("✅ Email alerts configured successfully")
 
-    def detect_crisis(self, text: str) -> Tuple[bool, Dict]:
-        """100% reliable crisis detection with email alerts"""
+    @traced("crisis.detect")
+    def detect_crisis(self, text: str, session_id: Optional[str] = None) -> Tuple[bool, Dict]:
+        """100% reliable crisis detection; email alerts are queued, not sent inline"""
         if not text.strip():
             return False, {}
 
-        text_lower = text.lower()
         details = {
             'triggers': [],
             'confidence': 0.0,
             'response': "",
             'alert_sent': False,
+            'alert_ticket': None,
             'alert_error': None
         }
 
-        # Check for crisis phrases
-        for phrase in self.crisis_phrases:
-            if phrase in text_lower:
-                details['triggers'].append(phrase)
-                details['confidence'] = 0.99  # Absolute certainty
+        # Check for crisis phrases (single pass over the normalised text)
+        details['triggers'] = self.crisis_matcher.matched_phrases(text)
+        if details['triggers']:
+            details['confidence'] = 0.99  # Absolute certainty
 
-        # Generate response and send alert if crisis detected
+        # Generate response and queue alert if crisis detected
         if details['confidence'] > 0.9:
             details['response'] = "🚨 Help is available! Emergency contacts have been notified."
-            if self.alert_recipient and self.smtp_config['sender']:
-                details['alert_sent'], details['alert_error'] = self._send_crisis_alert(text, details['triggers'])
+            if self.alerts_enabled:
+                try:
+                    with span("crisis.alert_enqueue"):
+                        details['alert_ticket'] = self.alert_outbox.enqueue(text, details['triggers'], session_id)
+                except Exception as e:
+                    details['alert_error'] = f"Alert queue failed: {str(e)}"
+                    print(details['alert_error'])
             else:
                 details['alert_error'] = "Email alerts not configured"
 
         return details['confidence'] > 0.9, details
 
-    def _send_crisis_alert(self, message: str, triggers: list) -> Tuple[bool, str]:
-        """Send emergency email alert with error handling"""
-        try:
-            msg = EmailMessage()
-            msg['Subject'] = "🚨 CRISIS ALERT - Immediate Action Required"
-            msg['From'] = self.smtp_config['sender']
-            msg['To'] = self.alert_recipient
-
-            msg.set_content(f"""
-            CRISIS DETECTED IN CHAT:
-
-            User Message:
-            {message}
-
-            Detected Triggers:
-            {", ".join(triggers)}
-
-            Required Action:
-            1. Contact user immediately
-            2. Escalate to mental health professional
-            3. Verify user safety
-            """)
-
-            with smtplib.SMTP(
-                    host=self.smtp_config['server'],
-                    port=self.smtp_config['port'],
-                    timeout=10  # Add timeout to prevent hanging
-            ) as server:
-                server.starttls()
-                server.login(
-                    self.smtp_config['sender'],
-                    self.smtp_config['password']
-                )
-                server.send_message(msg)
-            return True, None
-
-        except Exception as e:
-            error_msg = f"Email failed: {str(e)}"
-            print(error_msg)
-            return False, error_msg
+    def alert_status(self, ticket_id: str) -> Optional[Dict]:
+        """Delivery state of a queued alert ('pending', 'sent' or 'failed')"""
+        if not self.alerts_enabled:
+            return None
+        return self.alert_outbox.status(ticket_id)
+
+
+components.register('crisis_detector', CrisisDetectorWithEmail)
 
 
+def get_crisis_detector() -> CrisisDetectorWithEmail:
+    """Shared detector, so email config is verified once per process"""
+    return components.get('crisis_detector')
@@ -0,0 +1,107 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from arabic_text import load_lexicon
+
+DIALECT_LEXICON_PATH = os.getenv(
+    'DIALECT_LEXICON_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons', 'omani_dialect.tsv')
+)
+PROCLITICS = "وفبلك"
+
+# Letters, digits and Arabic diacritics, so "شكراً" is one word
+_WORD = re.compile(r"[\w\u0610-\u061A\u064B-\u065F\u0670]+")
+
+
+def load_dialect_lexicon(path: str = DIALECT_LEXICON_PATH) -> Dict[str, str]:
+    """Read `source<TAB>replacement` lines; sources are whitespace-normalised"""
+    mapping = {}
+    for line in load_lexicon(path):
+        source, _, replacement = line.partition("\t")
+        source = " ".join(source.split())
+        if source and replacement.strip() and source != replacement.strip():
+            mapping[source] = replacement.strip()
+    return mapping
+
+
+class DialectRewriter:
+    """Whole-word rewriting of many phrases in one left-to-right pass.
+
+    Each word position is looked up in a dict (longest multi-word source
+    first), so the cost is linear in the text whatever the lexicon size, and
+    a source never matches inside a longer word ("نعم" leaves "نعمة" alone).
+    """
+
+    def __init__(self, mapping: Dict[str, str], proclitics: str = PROCLITICS):
+        self.mapping = dict(mapping)
+        self.proclitics = proclitics
+        self.max_words = max((len(source.split()) for source in self.mapping), default=1)
+
+    def _lookup(self, key: str):
+        replacement = self.mapping.get(key)
+        if replacement is None and len(key) > 2 and key[0] in self.proclitics:
+            replacement = self.mapping.get(key[1:])
+            if replacement is not None:
+                replacement = key[0] + replacement
+        return replacement
+
+    def _rewrite(self, text: str, final: bool) -> Tuple[str, int]:
+        """Rewrite `text`; unless `final`, stop before words whose match could still
+        depend on text not received yet. Returns (output, characters consumed)."""
+        words = list(_WORD.finditer(text))
+        complete = len(words) if final or (words and words[-1].end() < len(text)) else len(words) - 1
+        out: List[str] = []
+        last = 0
+        i = 0
+        while i < len(words):
+            if not final and i + self.max_words > complete:
+                break
+            replacement, span = None, 1
+            for n in range(min(self.max_words, complete - i), 0, -1):
+                group = words[i:i + n]
+                # Multi-word sources only match words separated by plain whitespace
+                if any(not text[a.end():b.start()].isspace() for a, b in zip(group, group[1:])):
+                    continue
+                replacement = self._lookup(" ".join(word.group() for word in group))
+                if replacement is not None:
+                    span = n
+                    break
+            if replacement is not None:
+                out.append(text[last:words[i].start()])
+                out.append(replacement)
+                last = words[i + span - 1].end()
+            i += span
+
+        consumed = words[i].start() if i < len(words) else len(text)
+        out.append(text[last:consumed])
+        return "".join(out), consumed
+
+    def rewrite(self, text: str) -> str:
+        if self.max_words == 1:
+            # Common case: one compiled regex, one dict lookup per word
+            return _WORD.sub(lambda m: self._lookup(m.group()) or m.group(), text)
+        return self._rewrite(text, final=True)[0]
+
+    def stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Rewrite text arriving in arbitrary pieces (e.g. LLM tokens).
+
+        Output is identical to `rewrite()` on the joined text; only the words
+        that could still start a match are held back.
+        """
+        pending = ""
+        for chunk in chunks:
+            pending += chunk
+            ready, consumed = self._rewrite(pending, final=False)
+            pending = pending[consumed:]
+            if ready:
+                yield ready
+        if pending:
+            yield self.rewrite(pending)
+
+
+@lru_cache(maxsize=1)
+def get_dialect_rewriter() -> DialectRewriter:
+    """Omani dialect lexicon compiled once per process"""
+    return DialectRewriter(load_dialect_lexicon())
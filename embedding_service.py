@@ -0,0 +1,130 @@
+"""One AraBERT model per process, shared by ingestion and retrieval.
+
+Concurrent `embed_query()` calls are collected for a few milliseconds and
+run as one forward pass (micro-batching); `embed_documents()` encodes in
+fixed-size batches. The model can run int8 (dynamic quantisation of the
+Linear layers) or through ONNX Runtime, with a configurable thread count.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from ingest import EMBEDDING_MODEL
+from metrics import get_histogram
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # torch | onnx
+EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "none")  # none | int8 (re-embeds the store on change)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", 0))  # 0 = library default
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 5))  # How long a query waits for company
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", 32))
+
+
+class _TorchEncoder:
+    """sentence-transformers (mean pooling, as HuggingFaceEmbeddings did), optionally int8"""
+
+    def __init__(self, model_name, quantize, threads):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+        if quantize == "int8":
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True).tolist()
+
+
+class _OnnxEncoder:
+    """ONNX Runtime export of the same model (optimum), int8-quantised if asked"""
+
+    def __init__(self, model_name, quantize, threads):
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        export_dir = os.path.join("Data", "onnx", model_name.replace("/", "_"))
+        if not os.path.exists(export_dir):
+            ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(export_dir)
+        file_name = "model.onnx"
+        if quantize == "int8":
+            file_name = "model_quantized.onnx"
+            if not os.path.exists(os.path.join(export_dir, file_name)):
+                quantizer = ORTQuantizer.from_pretrained(export_dir)
+                quantizer.quantize(AutoQuantizationConfig.avx2(is_static=False), save_dir=export_dir)
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            export_dir, file_name=file_name, session_options=options
+        )
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        inputs = self.tokenizer(texts, padding=True, truncation=True, max_length=512, return_tensors="np")
+        hidden = self.model(**inputs).last_hidden_state
+        mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / mask.sum(axis=1).clip(min=1e-9)
+        return pooled.tolist()
+
+
+class EmbeddingService(Embeddings):
+    """LangChain embeddings backed by one shared, micro-batched model"""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, backend: str = EMBEDDING_BACKEND,
+                 quantize: str = EMBEDDING_QUANTIZE, threads: int = EMBEDDING_THREADS,
+                 batch_wait_ms: float = EMBEDDING_BATCH_WAIT_MS, max_batch: int = EMBEDDING_MAX_BATCH):
+        encoder = _OnnxEncoder if backend == "onnx" else _TorchEncoder
+        # Vectors from different settings are not comparable; ingest.py records these in its manifest
+        self.settings = {"model": model_name, "backend": backend, "quantize": quantize}
+        self.encoder = encoder(model_name, quantize, threads)
+        self.batch_wait = batch_wait_ms / 1000
+        self.max_batch = max_batch
+        self._model_lock = threading.Lock()  # Forward passes run one at a time on all cores
+        self._queries: "queue.Queue[tuple]" = queue.Queue()
+        self._batch_sizes = get_histogram("embedding.batch_size")
+        threading.Thread(target=self._run, name="embedding-batcher", daemon=True).start()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        with self._model_lock:
+            return self.encoder.encode(texts)
+
+    def embed_documents(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        batch_size = batch_size or self.max_batch
+        vectors = []
+        for i in range(0, len(texts), batch_size):
+            vectors.extend(self._encode(texts[i:i + batch_size]))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        future = Future()
+        self._queries.put((text, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queries.get()]
+            # Give concurrent turns a moment to join this forward pass
+            deadline = time.monotonic() + self.batch_wait
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queries.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+
+            self._batch_sizes.observe(len(batch))
+            try:
+                vectors = self._encode([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
@@ -1,25 +1,40 @@
-from langchain_groq import ChatGroq
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
-from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import ChatGoogleGenerativeAI
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, TimeoutError as FutureTimeout, wait
+from ingest import ingest, build_embeddings, open_vector_db, stored_embedding, VECTOR_DB_PATH, DATA_PATH
+from lexical_index import open_lexical_index
+import contextvars
 import os
+import threading
 import time
-import random
+import components
+import tracing
+from tracing import span, traced
+from rate_limiter import RateLimiter, estimate_tokens
+from session_store import SessionStore, window_history
+from crisis_detection import match_crisis_phrases, CRISIS_LEXICON_PATH
+from dialect import get_dialect_rewriter
+from postprocess import Insert, PostProcessor
+from arabic_text import load_lexicon
+from metrics import get_histogram, snapshot as metrics_snapshot
+from response_cache import ResponseCache, RESPONSE_CACHE
+from validation import build_validator, VALIDATOR
 
 # Configuration
 GROQ_API_KEY = "API"
 GOOGLE_API_KEY = "API"
-VECTOR_DB_PATH = "./chroma_db_omani_arabic"
-DATA_PATH = "./data/"
 CRISIS_HOTLINE = "الخط الساخن: 1111 (متوفر 24 ساعة)"
+RESPONSE_STRATEGY = os.getenv("RESPONSE_STRATEGY", "serial")  # serial | speculative
+TURN_LATENCY_BUDGET = float(os.getenv("TURN_LATENCY_BUDGET", 12))  # Seconds, speculative mode
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # hybrid | lexical (no embedding model) | dense
+
+# Shared by all turns for the concurrent validation/fallback calls
+_turn_executor = ThreadPoolExecutor(max_workers=int(os.getenv("TURN_WORKERS", 8)), thread_name_prefix="turn")
 
 
 # Initialize LLMs
+# Heavy clients are imported and built lazily (see warmup() below)
 def initialize_primary_llm():
+    from langchain_groq import ChatGroq
     return ChatGroq(
         temperature=0.4,  # Slightly higher for more natural responses
         groq_api_key=GROQ_API_KEY,
@@ -28,6 +43,7 @@ def initialize_primary_llm():
 
 
 def initialize_gemini():
+    from langchain_google_genai import ChatGoogleGenerativeAI
     return ChatGoogleGenerativeAI(
         model="gemini-2.5-flash",
         google_api_key=GOOGLE_API_KEY,
@@ -35,32 +51,21 @@ def initialize_gemini():
     )
 
 
-# Vector Database Setup
-def create_vector_db():
-    loader = DirectoryLoader(
-        DATA_PATH,
-        glob="*.pdf",
-        loader_cls=PyPDFLoader
-    )
-    documents = loader.load()
+components.register("primary_llm", initialize_primary_llm)
+components.register("gemini", initialize_gemini)
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=400,  # Increased for better context
-        chunk_overlap=80,
-        separators=["\n\n", "\n", "،", ".", "؟", "!", "؛", ":"]
-    )
-    texts = text_splitter.split_documents(documents)
 
-    embeddings = HuggingFaceEmbeddings(
-        model_name="UBC-NLP/AraBERT",
-        model_kwargs={"device": "cpu"}
-    )
+def get_gemini():
+    """Shared Gemini client, reusing its HTTP connections across turns"""
+    return components.get("gemini")
 
-    return Chroma.from_documents(
-        documents=texts,
-        embedding=embeddings,
-        persist_directory=VECTOR_DB_PATH
-    )
+
+# Vector Database Setup
+def create_vector_db(embeddings=None):
+    """Incrementally ingest DATA_PATH; only new or changed PDFs are embedded"""
+    vector_db, stats = ingest(DATA_PATH, VECTOR_DB_PATH, embeddings=embeddings)
+    print(f"تمت معالجة {stats['files']} ملفات ({stats['chunks']} مقطع)")
+    return vector_db
 
 
 # Natural Conversation Style Prompt (Omani Arabic)
@@ -80,36 +85,38 @@ islamic_prompt = """
 - أمثلة من الحياة اليومية في عمان
 - أساليب استماع فعالة (التكرار التأكيدي، إظهار التفهم)
 
+المحادثة السابقة: {history}
 السؤال: {question}
 المعلومات ذات الصلة: {context}
 الرد:"""
 
 PROMPT = PromptTemplate(
     template=islamic_prompt,
-    input_variables=["context", "question"]
+    input_variables=["context", "question", "history"]
 )
+NO_HISTORY = "لا يوجد"
 
 
-# Rate Limiter for Gemini
-class RateLimiter:
-    def __init__(self, calls_per_minute):
-        self.interval = 60 / calls_per_minute
-        self.last_call = 0
-
-    def wait(self):
-        elapsed = time.time() - self.last_call
-        if elapsed < self.interval:
-            time.sleep(self.interval - elapsed)
-        self.last_call = time.time()
-
-
-gemini_limiter = RateLimiter(60)
+# Rate Limiters: one token bucket per provider (requests and tokens per minute)
+groq_limiter = RateLimiter(
+    float(os.getenv("GROQ_RPM", 30)),
+    tokens_per_minute=float(os.getenv("GROQ_TPM", 15000)),
+    burst=float(os.getenv("GROQ_BURST", 5)),
+    name="groq"
+)
+gemini_limiter = RateLimiter(
+    float(os.getenv("GEMINI_RPM", 60)),
+    tokens_per_minute=float(os.getenv("GEMINI_TPM", 250000)),
+    burst=float(os.getenv("GEMINI_BURST", 3)),
+    name="gemini"
+)
 
 
 # Response Processing Functions
-def validate_response(query, response):
-    """Use Gemini to validate response quality"""
-    gemini_limiter.wait()
+@traced("llm.validate")
+def ask_gemini_validation(query, response):
+    """Gemini's raw verdict on response quality"""
+    gemini_limiter.wait(estimate_tokens(query + response) + 100)
 
     validation_prompt = f"""
     هل هذا الرد:
@@ -124,17 +131,14 @@ def validate_response(query, response):
     أجب بـ "نعم" فقط إذا تحققت جميع الشروط
     """
 
-    gemini = initialize_gemini()
-    result = gemini.invoke(validation_prompt).content
-    return "نعم" in result
-
+    gemini = get_gemini()
+    return gemini.invoke(validation_prompt).content
 
-def get_gemini_fallback(query):
-    """Generate fallback response from Gemini"""
-    gemini_limiter.wait()
 
-    prompt = f"""
+def _fallback_prompt(query, history=""):
+    return f"""
     [باللهجة العمانية] قدم نصيحة إسلامية للصحة النفسية:
+    المحادثة السابقة: {history or NO_HISTORY}
     السؤال: {query}
 
     يجب أن:
@@ -145,122 +149,218 @@ def get_gemini_fallback(query):
     - تذكر مصدراً إسلامياً واحداً بشكل غير مباشر
     """
 
-    gemini = initialize_gemini()
+
+@traced("llm.fallback")
+def get_gemini_fallback(query, history=""):
+    """Generate fallback response from Gemini"""
+    prompt = _fallback_prompt(query, history)
+    gemini_limiter.wait(estimate_tokens(prompt))
+
+    gemini = get_gemini()
     return gemini.invoke(prompt).content
 
 
-def format_response(text, query):
-    """Convert text to natural speech patterns"""
-    # Remove academic markers
-    text = text.replace("•", "").replace("١-", "").replace("(1)", "")
+# Phrase banks used by the post-processing stages
+FILLERS = ["يا ابن/بنت الحلال", "الله يساعدك", "تفضل/تفضلي"]
+PARTICLES = ["شوف/شوفي", "يا أخي/أختي", "والله أعلم"]
+OPENERS = ["والله يسهل أمورك", "الله يعينك", "ربي يفرج همك"]
+ACADEMIC_MARKERS = ["•", "١-", "(1)"]
+BREATHING_TECHNIQUE = "\n\nخد/خدي نفس عميق (شهيق 4 ثواني، زفير 6 ثواني)... كررها 3 مرات"
+REFLECTION_QUESTION = "\n\nشو رأيك تجرب/تجربي هالخطوة الأسبوع الجاي؟"
+CRISIS_RESPONSE = f"\n\n(بعد لحظة)... حياك/حياكي على {CRISIS_HOTLINE}"
+CRISIS_REPLY = (
+    "أنا وياك، وسلامتك أهم شي الحين. الله يحفظك، لا تظل بروحك: "
+    f"كلم {CRISIS_HOTLINE} أو روح لأقرب طوارئ، وخل حد تثق فيه يكون جنبك."
+)
+# Speculative mode, when neither model has answered by the end of the budget
+TIMEOUT_REPLY = "السموحة، الرد تأخر شوي. ممكن تعيد سؤالك؟"
+
+
+# Declarative post-processing rules (see postprocess.py)
+QUERY_CLASSIFIERS = {
+    "anxiety": ["قلق", "توتر"],
+    "fear": ["خوف"],
+    "family": ["أسرة", "زوج", "أولاد"],
+}
+REPLY_INSERTS = [
+    Insert("format", "prefix", FILLERS, when={"anxiety"}, dialect=True),
+    Insert("format", "suffix", PARTICLES, dialect=True),
+    Insert("cultural", "prefix", OPENERS),
+    Insert("therapeutic", "suffix", BREATHING_TECHNIQUE, when={"anxiety", "fear"}, joiner=""),
+    Insert("therapeutic", "suffix", REFLECTION_QUESTION, when={"family"}, joiner=""),
+    Insert("therapeutic", "prefix", CRISIS_RESPONSE, when={"crisis"}, joiner="\n\n"),
+]
+
+
+def _build_postprocessor():
+    return PostProcessor(
+        classifiers=dict(QUERY_CLASSIFIERS, crisis=load_lexicon(CRISIS_LEXICON_PATH)),
+        inserts=REPLY_INSERTS,
+        strip=ACADEMIC_MARKERS,
+        rewriter=get_dialect_rewriter(),
+    )
 
-    # Add conversational fillers
-    fillers = ["يا ابن/بنت الحلال", "الله يساعدك", "تفضل/تفضلي"]
-    if any(word in query for word in ["قلق", "توتر"]):
-        text = random.choice(fillers) + " " + text
 
-    # Add Omani dialect particles
-    particles = ["شوف/شوفي", "يا أخي/أختي", "والله أعلم"]
-    text = text + " " + random.choice(particles)
+def get_postprocessor():
+    return components.get("postprocessor")
 
-    return text
 
+def _build_validator():
+    # Inserted openers/particles are ours, not the model's: the local rules skip them without a draft
+    return build_validator(VALIDATOR, ask_gemini_validation, ignore=get_postprocessor().phrases())
 
-def apply_cultural_adjustment(response):
-    """Adapt for Omani cultural context"""
-    # Replace MSA with Omani dialect equivalents
-    dialect_map = {
-        "القلب": "الفؤاد",
-        "الكثير": "وايد",
-        "حاول": "جرب",
-        "المشكلة": "الشكلة",
-        "نعم": "إي",
-        "لا": "لا",
-        "شكراً": "يعطيك العافية",
-        "تفضل": "هيه"
-    }
 
-    for fusha, omani in dialect_map.items():
-        response = response.replace(fusha, omani)
+def get_validator():
+    return components.get("validator")
 
-    # Add culturally appropriate openers
-    openers = ["والله يسهل أمورك", "الله يعينك", "ربي يفرج همك"]
-    return random.choice(openers) + " " + response
 
+@traced("validate")
+def validate_response(query, response, draft=None):
+    """Is the reply natural, Omani, practical and free of academic structure? (see validation.py)"""
+    return get_validator().validate(query, response, draft)
 
-def enhance_therapeutic_quality(response, query):
-    """Apply evidence-based therapeutic techniques"""
-    # For anxiety-related queries
-    if "قلق" in query or "توتر" in query or "خوف" in query:
-        breathing_technique = "\n\nخد/خدي نفس عميق (شهيق 4 ثواني، زفير 6 ثواني)... كررها 3 مرات"
-        response += breathing_technique
 
-    # For relationship issues
-    if "أسرة" in query or "زوج" in query or "أولاد" in query:
-        reflection_question = "\n\nشو رأيك تجرب/تجربي هالخطوة الأسبوع الجاي؟"
-        response += reflection_question
+def fixed_phrases():
+    """Every fixed phrase the post-processing can add, as it appears in replies"""
+    return get_postprocessor().phrases() + [CRISIS_REPLY]
 
-    # Crisis detection
-    crisis_keywords = ["انتحار", "أموت", "خلصت نفسي", "ما أبغى عيش"]
-    if any(kw in query for kw in crisis_keywords):
-        crisis_response = f"\n\n(بعد لحظة)... حياك/حياكي على {CRISIS_HOTLINE}"
-        response = crisis_response + "\n\n" + response
 
-    return response
+def _apply_dialect(text):
+    return get_dialect_rewriter().rewrite(text)
 
 
-# Main Chatbot Setup
-print("جارٍ تحميل المستشار النفسي الإسلامي العماني...")
+def format_response(text, query):
+    """Convert text to natural speech patterns"""
+    return get_postprocessor().process(text, query, stages=("format",))
+
+
+def apply_cultural_adjustment(response):
+    """Adapt for Omani cultural context"""
+    return get_postprocessor().process(response, "", stages=("cultural",))
+
 
-# Initialize components
-try:
-    primary_llm = initialize_primary_llm()
+def enhance_therapeutic_quality(response, query):
+    """Apply evidence-based therapeutic techniques"""
+    return get_postprocessor().process(response, query, stages=("therapeutic",))
 
+
+# Main Chatbot Setup
+def _load_vector_db():
+    embeddings = components.get("embeddings")
     if not os.path.exists(VECTOR_DB_PATH):
         print("جارٍ إنشاء قاعدة المعرفة العربية...")
-        vector_db = create_vector_db()
-    else:
-        embeddings = HuggingFaceEmbeddings(
-            model_name="UBC-NLP/AraBERT",
-            model_kwargs={"device": "cpu"}
-        )
-        vector_db = Chroma(
-            persist_directory=VECTOR_DB_PATH,
-            embedding_function=embeddings
-        )
-
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=primary_llm,
-        chain_type="stuff",
-        retriever=vector_db.as_retriever(search_kwargs={"k": 4}),  # More context
-        chain_type_kwargs={"prompt": PROMPT},
-        return_source_documents=True
-    )
+        return create_vector_db(embeddings)
+    settings = getattr(embeddings, "settings", None)
+    if settings and stored_embedding(VECTOR_DB_PATH) != settings:
+        print(f"إعدادات التضمين {settings} تختلف عن قاعدة المعرفة {stored_embedding(VECTOR_DB_PATH)} - "
+              "شغّل python ingest.py لإعادة التضمين")
+    return open_vector_db(embeddings)
 
-    print("جاهز للاستخدام! يمكنك البدء في طرح أسئلتك.")
-except Exception as e:
-    print(f"حدث خطأ أثناء الإعداد: {str(e)}")
 
+def _build_retriever():
+    from retrieval_cache import build_cached_retriever
+    lexical = open_lexical_index(VECTOR_DB_PATH)
+    if RETRIEVAL_MODE == "lexical" and lexical is not None:
+        # CPU-starved deployments: BM25 only, the embedding model is never loaded
+        return build_cached_retriever(None, k=4, lexical=lexical, mode="lexical")
+    vector_db = components.get("vector_db")  # The first run builds the store and the index
+    lexical = lexical or open_lexical_index(VECTOR_DB_PATH)
+    return build_cached_retriever(vector_db, k=4, lexical=lexical, mode=RETRIEVAL_MODE)  # More context
 
-# Main Response Handler
-def respond(message, history):
-    if not message.strip():
-        return "الرجاء مشاركة مشاعرك أو طرح سؤالك."
 
+components.register("embeddings", build_embeddings)
+components.register("vector_db", _load_vector_db)
+components.register("retriever", _build_retriever)
+components.register("session_store", SessionStore)
+components.register("postprocessor", _build_postprocessor)
+components.register("validator", _build_validator)
+components.register("response_cache", lambda: ResponseCache(components.get("embeddings")))
+
+
+def get_primary_llm():
+    return components.get("primary_llm")
+
+
+def get_retriever():
+    """Cached retriever shared by respond() and the streaming path"""
+    return components.get("retriever")
+
+
+# Readiness: cold -> loading -> ready | failed
+_readiness = {"state": "cold", "error": None, "seconds": None}
+_readiness_lock = threading.Lock()
+
+
+def readiness():
+    with _readiness_lock:
+        return dict(_readiness)
+
+
+def warmup():
+    """Load the models, knowledge base and clients; safe to call from any thread"""
+    with _readiness_lock:
+        if _readiness["state"] in ("loading", "ready"):
+            return _readiness["state"] == "ready"
+        _readiness.update(state="loading", error=None)
+
+    print("جارٍ تحميل المستشار النفسي الإسلامي العماني...")
+    started = time.perf_counter()
     try:
-        # Step 1: Get primary response
-        result = qa_chain.invoke({"query": message})
-        primary_response = result["result"]
+        get_retriever()
+        get_primary_llm()
+        get_gemini()
+    except Exception as e:
+        print(f"حدث خطأ أثناء الإعداد: {str(e)}")
+        with _readiness_lock:
+            _readiness.update(state="failed", error=str(e), seconds=time.perf_counter() - started)
+        return False
+
+    with _readiness_lock:
+        _readiness.update(state="ready", seconds=time.perf_counter() - started)
+    print("جاهز للاستخدام! يمكنك البدء في طرح أسئلتك.")
+    return True
 
-        # Step 2: Process response
-        processed = format_response(primary_response, message)
-        processed = apply_cultural_adjustment(processed)
 
-        # Step 3: Validate with Gemini
-        if validate_response(message, processed):
+# Main Response Handler
+def build_primary_prompt(message, history=""):
+    """Retrieve context for `message` and fill the counsellor prompt"""
+    with span("retrieval"):
+        docs = get_retriever().invoke(message)
+    context = "\n\n".join(doc.page_content for doc in docs)
+    prompt = PROMPT.format(context=context, question=message, history=history or NO_HISTORY)
+    get_histogram("prompt.tokens").observe(estimate_tokens(prompt))
+    return prompt
+
+
+def _primary_answer(message, history=""):
+    """Steps 1-2: Groq answer over the retrieved context; (raw answer, post-processed)"""
+    prompt = build_primary_prompt(message, history)
+    groq_limiter.wait(estimate_tokens(prompt))
+    with span("llm.primary"):
+        answer = get_primary_llm().invoke(prompt).content
+    return answer, get_postprocessor().process(answer, message, stages=("format", "cultural"))
+
+
+def _fallback_answer(message, history=""):
+    """Step 5: Gemini answer, fully post-processed"""
+    fallback = get_gemini_fallback(message, history)
+    return get_postprocessor().process(fallback, message)
+
+
+# The strategies return (reply, validated), where validated is (raw primary answer,
+# LLM calls it took) if the primary answer passed validation, else None
+def _respond_serial(message, history=""):
+    try:
+        # Step 1-2: Get and process primary response
+        answer, processed = _primary_answer(message, history)
+
+        # Step 3: Validate, locally when the score is clear, else with Gemini
+        decision = get_validator().decide_locally(message, processed, answer)
+        valid = decision if decision is not None else validate_response(message, processed, answer)
+        if valid:
             # Step 4: Enhance therapeutic quality
             final_response = enhance_therapeutic_quality(processed, message)
-            return final_response
+            return final_response, (answer, 1 if decision is not None else 2)
 
         # If validation fails
         raise ValueError("الإجابة الأولية لم تتجاوز التحقق")
@@ -268,7 +368,282 @@ def respond(message, history):
     except Exception as e:
         print(f"الانتقال للإجابة البديلة: {str(e)}")
         # Step 5: Use Gemini fallback
-        fallback = get_gemini_fallback(message)
-        processed_fallback = format_response(fallback, message)
-        processed_fallback = apply_cultural_adjustment(processed_fallback)
-        return enhance_therapeutic_quality(processed_fallback, message)
\ No newline at end of file
+        return _fallback_answer(message, history), None
+
+
+def _first_result(futures, timeout):
+    """(future, result) of whichever future succeeds first within `timeout` seconds.
+
+    Raises the last error if all of them fail, FutureTimeout if none finishes in time.
+    """
+    deadline = time.monotonic() + timeout
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            raise FutureTimeout()
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return future, future.result()
+            error = future.exception()
+    raise error
+
+
+def _submit(fn, *args):
+    """Run `fn` on the turn executor, keeping the caller's turn id for tracing"""
+    return _turn_executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _respond_speculative(message, budget, history=""):
+    """Validate and generate the Gemini fallback at the same time.
+
+    Whichever result is not needed is cancelled (or discarded if already
+    running). Once `budget` seconds have passed the best answer available
+    is returned: the unvalidated primary answer beats waiting longer.
+    """
+    deadline = time.monotonic() + budget
+
+    def remaining():
+        return max(0.0, deadline - time.monotonic())
+
+    primary = _submit(_primary_answer, message, history)
+    try:
+        answer, processed = primary.result(timeout=remaining())
+    except FutureTimeout:
+        # Nothing to serve yet: race Gemini against the late primary answer
+        # for one more budget; the primary draft is served unvalidated if it wins
+        print("تجاوز الوقت المحدد - سباق بين الإجابتين")
+        fallback = _submit(_fallback_answer, message, history)
+        try:
+            winner, result = _first_result([primary, fallback], budget)
+        except FutureTimeout:
+            print("لا توجد إجابة بعد انتهاء المهلة")
+            fallback.cancel()
+            return TIMEOUT_REPLY, None
+        if winner is primary:
+            return enhance_therapeutic_quality(result[1], message), None
+        return result, None
+    except Exception as e:
+        print(f"الانتقال للإجابة البديلة: {str(e)}")
+        return _fallback_answer(message, history), None
+
+    # A local verdict takes milliseconds: no point racing Gemini for the fallback
+    decision = get_validator().decide_locally(message, processed, answer)
+    if decision is True:
+        return enhance_therapeutic_quality(processed, message), (answer, 1)
+    if decision is False:
+        try:
+            return _submit(_fallback_answer, message, history).result(timeout=remaining()), None
+        except Exception as e:
+            print(f"الإجابة البديلة غير متاحة، استخدام الإجابة الأولية: {str(e) or 'timeout'}")
+            return enhance_therapeutic_quality(processed, message), None
+
+    validation = _submit(validate_response, message, processed, answer)
+    fallback = _submit(_fallback_answer, message, history)
+    try:
+        valid = validation.result(timeout=remaining())
+    except FutureTimeout:
+        print("تجاوز الوقت المحدد - إرسال الإجابة بدون تحقق")
+        fallback.cancel()
+        return enhance_therapeutic_quality(processed, message), None
+    except Exception as e:
+        print(f"فشل التحقق: {str(e)}")
+        valid = False
+
+    if valid:
+        fallback.cancel()
+        return enhance_therapeutic_quality(processed, message), (answer, 2)
+
+    try:
+        return fallback.result(timeout=remaining()), None
+    except Exception as e:
+        print(f"الإجابة البديلة غير متاحة، استخدام الإجابة الأولية: {str(e) or 'timeout'}")
+        return enhance_therapeutic_quality(processed, message), None
+
+
+def get_session_store():
+    return components.get("session_store")
+
+
+def _history_text(history, session_id):
+    """Bounded history for the prompt: the session store wins over a passed-in list"""
+    if session_id is not None:
+        return get_session_store().history_text(session_id)
+    return window_history(history)
+
+
+def _remember(session_id, message, reply):
+    if session_id is not None:
+        store = get_session_store()
+        store.record_turn(session_id, message, reply)
+        get_histogram("sessions.memory_bytes").observe(store.memory_bytes())
+
+
+def get_response_cache():
+    """The semantic response cache, or None unless RESPONSE_CACHE=1"""
+    return components.get("response_cache") if RESPONSE_CACHE else None
+
+
+def _cache_key(cache, message):
+    """Query embedding for the cache, or None if the cache is off or embedding fails"""
+    if cache is None:
+        return None
+    try:
+        with span("response_cache.embed"):
+            return cache.embed(message)
+    except Exception as e:
+        print(f"Response cache unavailable: {e}")
+        return None
+
+
+def _cached_answer(cache, vector, message, validating=True):
+    """Post-processed cached answer for `message`, or None on a miss"""
+    if vector is None:
+        return None
+    hit = cache.lookup(vector)
+    if hit is None:
+        return None
+    answer, llm_calls = hit
+    # Streaming never validates, so there a hit only saves the primary answer
+    cache.count_saved(llm_calls if validating else 1)
+    # Openers and particles are picked afresh, so a repeated question gets a varied reply
+    return get_postprocessor().process(answer, message)
+
+
+def respond(message, history, strategy=None, session_id=None):
+    if not message.strip():
+        return "الرجاء مشاركة مشاعرك أو طرح سؤالك."
+
+    # Crisis turns get the hotline immediately, before any LLM call (and before the cache)
+    if match_crisis_phrases(message):
+        _remember(session_id, message, CRISIS_REPLY)
+        return CRISIS_REPLY
+
+    history_text = _history_text(history, session_id)
+    # Cached answers ignore the conversation so far, so they only serve a session's first turn
+    cache = get_response_cache() if not history_text else None
+    vector = _cache_key(cache, message)
+    reply = _cached_answer(cache, vector, message)
+    if reply is not None:
+        _remember(session_id, message, reply)
+        return reply
+
+    strategy = strategy or RESPONSE_STRATEGY
+    started = time.perf_counter()
+    try:
+        if strategy == "speculative":
+            reply, validated = _respond_speculative(message, TURN_LATENCY_BUDGET, history_text)
+        else:
+            reply, validated = _respond_serial(message, history_text)
+    finally:
+        get_histogram(f"respond.{strategy}.seconds").observe(time.perf_counter() - started)
+
+    # Only answers that passed validation and owe nothing to one user's history are shared
+    if vector is not None and validated is not None:
+        answer, llm_calls = validated
+        cache.put(message, vector, answer, llm_calls)
+    _remember(session_id, message, reply)
+    return reply
+
+
+def response_cache_report():
+    """Hit rate, LLM calls saved and size of the response cache (None when it is off)"""
+    cache = get_response_cache()
+    return cache.stats() if cache is not None else None
+
+
+def turn_latency_report():
+    """p50/p95 turn latency per response strategy"""
+    return {
+        name: summary for name, summary in metrics_snapshot().items()
+        if name.startswith("respond.")
+    }
+
+
+# Streaming Response Handler
+def _stream_affixes(message):
+    """Prefix/suffix the post-processing pipeline would wrap around the LLM text"""
+    prefix, suffix = get_postprocessor().affixes(message)
+    return "".join(prefix), "".join(suffix)
+
+
+def _llm_words(llm, prompt):
+    """LLM text without academic markers, released one whole word at a time"""
+    pending = ""
+    for chunk in llm.stream(prompt):
+        pending += chunk.content
+        cut = max(pending.rfind(" "), pending.rfind("\n"))
+        if cut < 0:
+            continue
+        ready, pending = pending[:cut + 1], pending[cut + 1:]
+        yield get_postprocessor().strip(ready)
+    if pending:
+        yield get_postprocessor().strip(pending)
+
+
+def _stream_llm_text(llm, prompt):
+    """Yield post-processed LLM text as it is generated"""
+    return get_dialect_rewriter().stream(_llm_words(llm, prompt))
+
+
+def stream_respond(message, history=None, session_id=None):
+    """Yield the reply incrementally as the primary LLM generates it.
+
+    Text is post-processed on the fly so speech can start before the reply
+    is complete. Spoken text cannot be taken back, so the Gemini validation
+    step of respond() is skipped; Gemini is only used if Groq fails before
+    producing any text.
+    """
+    if not message.strip():
+        yield "الرجاء مشاركة مشاعرك أو طرح سؤالك."
+        return
+
+    # Crisis turns get the hotline immediately, before any LLM call
+    if match_crisis_phrases(message):
+        _remember(session_id, message, CRISIS_REPLY)
+        yield CRISIS_REPLY
+        return
+
+    history_text = _history_text(history, session_id)
+    # Streamed answers are not validated, so they are never stored; hits are served whole
+    cache = get_response_cache() if not history_text else None
+    cached = _cached_answer(cache, _cache_key(cache, message), message, validating=False)
+    if cached is not None:
+        _remember(session_id, message, cached)
+        yield cached
+        return
+
+    prefix, suffix = _stream_affixes(message)
+    reply = [prefix]
+    yield prefix
+
+    streamed_any = False
+    try:
+        prompt = build_primary_prompt(message, history_text)
+        groq_limiter.wait(estimate_tokens(prompt))
+        requested = time.perf_counter()
+        for text in _stream_llm_text(get_primary_llm(), prompt):
+            if not streamed_any:
+                # A span cannot stay open across yields; time to first text instead
+                tracing.record("llm.primary.first_token", time.perf_counter() - requested, started=requested)
+            streamed_any = True
+            reply.append(text)
+            yield text
+    except Exception as e:
+        if streamed_any:
+            print(f"انقطع البث: {str(e)}")
+        else:
+            print(f"الانتقال للإجابة البديلة: {str(e)}")
+            fallback_prompt = _fallback_prompt(message, history_text)
+            gemini_limiter.wait(estimate_tokens(fallback_prompt))
+            for text in _stream_llm_text(get_gemini(), fallback_prompt):
+                reply.append(text)
+                yield text
+
+    reply.append(suffix)
+    _remember(session_id, message, "".join(reply))
+    yield suffix
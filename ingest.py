@@ -0,0 +1,233 @@
+"""Incremental knowledge-base ingestion.
+
+Only new or changed PDFs under DATA_PATH are parsed, split and embedded;
+chunks of removed files are deleted. A manifest of file hashes and chunk
+ids is kept next to the Chroma store, and the BM25 index (lexical_index.py)
+is rebuilt whenever the store changes. The manifest also records the
+embedding settings; changing them (e.g. EMBEDDING_QUANTIZE) re-embeds
+everything, since old and new vectors are not comparable.
+
+    python ingest.py --workers 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from lexical_index import build_lexical_index, index_path
+
+VECTOR_DB_PATH = "./chroma_db_omani_arabic"
+DATA_PATH = "./data/"
+EMBEDDING_MODEL = "UBC-NLP/AraBERT"
+MANIFEST_NAME = "ingest_manifest.json"
+# Stores built before the manifest recorded its embedding settings were fp32 torch
+LEGACY_EMBEDDING = {"model": EMBEDDING_MODEL, "backend": "torch", "quantize": "none"}
+
+
+def build_text_splitter():
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=400,  # Increased for better context
+        chunk_overlap=80,
+        separators=["\n\n", "\n", "،", ".", "؟", "!", "؛", ":"]
+    )
+
+
+def build_embeddings():
+    """Micro-batched, quantised AraBERT (see embedding_service.py)"""
+    from embedding_service import EmbeddingService
+    return EmbeddingService(EMBEDDING_MODEL)
+
+
+def open_vector_db(embeddings=None, db_path=VECTOR_DB_PATH):
+    from langchain_chroma import Chroma
+    return Chroma(
+        persist_directory=db_path,
+        embedding_function=embeddings or build_embeddings()
+    )
+
+
+# Manifest
+def manifest_path(db_path=VECTOR_DB_PATH):
+    return os.path.join(db_path, MANIFEST_NAME)
+
+
+def load_manifest(db_path=VECTOR_DB_PATH) -> Dict:
+    try:
+        with open(manifest_path(db_path), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"version": 0, "files": {}}
+
+
+def save_manifest(manifest: Dict, db_path=VECTOR_DB_PATH) -> None:
+    os.makedirs(db_path, exist_ok=True)
+    tmp_path = manifest_path(db_path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path(db_path))
+
+
+def stored_embedding(db_path=VECTOR_DB_PATH) -> Dict:
+    """Embedding settings the store's vectors were made with"""
+    return load_manifest(db_path).get("embedding", LEGACY_EMBEDDING)
+
+
+def knowledge_base_version(db_path=VECTOR_DB_PATH) -> int:
+    """Bumped by every ingestion that changes the store; caches key on it"""
+    return load_manifest(db_path).get("version", 0)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _scan(data_path: str) -> Dict[str, str]:
+    files = {}
+    for name in sorted(os.listdir(data_path)):
+        if name.lower().endswith(".pdf"):
+            files[name] = _file_sha256(os.path.join(data_path, name))
+    return files
+
+
+# Process-pool workers
+def _chunk_prefix(name: str, digest: str) -> str:
+    """Id prefix for one file's chunks; includes the name so identical copies don't share ids"""
+    return hashlib.sha256(f"{name}\0{digest}".encode("utf-8")).hexdigest()[:16]
+
+
+def _load_and_split(path: str, name: str, digest: str) -> Tuple[int, List[Tuple[str, str, Dict]]]:
+    """Parse and split one PDF; returns (pages, [(chunk_id, text, metadata)])"""
+    from langchain_community.document_loaders import PyPDFLoader
+    pages = PyPDFLoader(path).load()
+    chunks = build_text_splitter().split_documents(pages)
+    prefix = _chunk_prefix(name, digest)
+    return len(pages), [
+        (f"{prefix}-{i}", chunk.page_content, chunk.metadata)
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def rebuild_lexical_index(vector_db, db_path=VECTOR_DB_PATH, kb_version=0) -> int:
+    """Re-index every chunk in the store for BM25 search"""
+    stored = vector_db.get(include=["documents", "metadatas"])
+    return build_lexical_index(zip(stored["ids"], stored["documents"], stored["metadatas"]), db_path, kb_version)
+
+
+def _batched(items: List, size: int) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def ingest(data_path=DATA_PATH, db_path=VECTOR_DB_PATH, workers=None, batch_size=64, embeddings=None):
+    """Bring the vector store in line with the PDFs in `data_path`"""
+    embeddings = embeddings or build_embeddings()  # One model for the whole run
+    manifest = load_manifest(db_path)
+    settings = getattr(embeddings, "settings", None)
+    if os.path.exists(db_path) and not os.path.exists(manifest_path(db_path)):
+        print("قاعدة المعرفة بدون سجل - سيتم إعادة بنائها بالكامل")
+        open_vector_db(embeddings, db_path).delete_collection()
+    elif settings and manifest["files"] and manifest.get("embedding", LEGACY_EMBEDDING) != settings:
+        print("إعدادات التضمين تغيرت - سيتم إعادة تضمين كل الملفات")
+        open_vector_db(embeddings, db_path).delete_collection()
+        manifest["files"] = {}
+    if settings:
+        manifest["embedding"] = settings
+
+    vector_db = open_vector_db(embeddings, db_path)
+    current = _scan(data_path)
+    known = manifest["files"]
+
+    changed = [name for name, digest in current.items() if known.get(name, {}).get("sha256") != digest]
+    removed = [name for name in known if name not in current]
+
+    # Drop chunks of removed or changed documents
+    stale_ids = [chunk_id for name in removed + changed for chunk_id in known.get(name, {}).get("chunk_ids", [])]
+    if stale_ids:
+        vector_db.delete(ids=stale_ids)
+    for name in removed:
+        del known[name]
+
+    stats = {"files": len(changed), "removed": len(removed), "pages": 0, "chunks": 0,
+             "parse_seconds": 0.0, "embed_seconds": 0.0, "index_seconds": 0.0}
+    if not changed:
+        if removed:
+            manifest["version"] += 1
+        if removed or not os.path.exists(index_path(db_path)):
+            started = time.perf_counter()
+            rebuild_lexical_index(vector_db, db_path, manifest["version"])
+            stats["index_seconds"] = time.perf_counter() - started
+        if removed:
+            save_manifest(manifest, db_path)
+        return vector_db, stats
+
+    # Parse and split in parallel
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            name: pool.submit(_load_and_split, os.path.join(data_path, name), name, current[name])
+            for name in changed
+        }
+        parsed = {name: future.result() for name, future in futures.items()}
+    stats["parse_seconds"] = time.perf_counter() - started
+
+    chunks = [chunk for _, file_chunks in parsed.values() for chunk in file_chunks]
+    stats["pages"] = sum(pages for pages, _ in parsed.values())
+    stats["chunks"] = len(chunks)
+
+    # Embed in batches with the one shared model (it already uses every core)
+    started = time.perf_counter()
+    for batch in _batched(chunks, batch_size):
+        vector_db.add_texts(
+            texts=[text for _, text, _ in batch],
+            metadatas=[metadata for _, _, metadata in batch],
+            ids=[chunk_id for chunk_id, _, _ in batch]
+        )
+    stats["embed_seconds"] = time.perf_counter() - started
+
+    for name, (pages, file_chunks) in parsed.items():
+        known[name] = {
+            "sha256": current[name],
+            "pages": pages,
+            "chunk_ids": [chunk_id for chunk_id, _, _ in file_chunks]
+        }
+    manifest["version"] += 1
+
+    # Lexical index first: retrievers reload it when they see the new manifest
+    started = time.perf_counter()
+    rebuild_lexical_index(vector_db, db_path, manifest["version"])
+    stats["index_seconds"] = time.perf_counter() - started
+
+    save_manifest(manifest, db_path)
+    return vector_db, stats
+
+
+def _report(stats: Dict) -> None:
+    parse_rate = stats["pages"] / stats["parse_seconds"] if stats["parse_seconds"] else 0.0
+    embed_rate = stats["chunks"] / stats["embed_seconds"] if stats["embed_seconds"] else 0.0
+    print(f"files updated: {stats['files']}, removed: {stats['removed']}")
+    print(f"pages: {stats['pages']} ({parse_rate:.1f} pages/s)")
+    print(f"chunks: {stats['chunks']} ({embed_rate:.1f} chunks/s)")
+    print(f"lexical index: {stats['index_seconds']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally ingest PDFs into the knowledge base")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--db", default=VECTOR_DB_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="PDF parsing processes")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    _, stats = ingest(args.data, args.db, args.workers, args.batch_size)
+    _report(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""BM25 inverted index over the knowledge-base chunks.
+
+Built by ingest.py next to the Chroma store and memory-mapped at startup.
+Arabic words are normalised and light-stemmed (common prefixes such as
+وال/بال and suffixes such as ها/ات/ين removed), so "بالقلق" and "القلق"
+hit the same postings. Needs no model: lexical-only retrieval runs on a
+CPU with nothing else loaded.
+
+Each build goes into a fresh <db_path>/lexical_index/<version>/ and the
+CURRENT file is then switched to name it, so a mapped index is never
+renamed or overwritten (Windows refuses both):
+    CURRENT        name of the live version directory
+    <version>/meta.json     vocabulary (term -> postings start/count), chunk
+                            ids, chunk lengths and byte offsets into chunks.jsonl
+    <version>/postings.u32  (chunk number, term frequency) pairs, uint32
+    <version>/chunks.jsonl  one {"text", "metadata"} object per chunk
+"""
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from arabic_text import normalize_arabic
+
+LEXICAL_INDEX_DIR = "lexical_index"
+CURRENT_FILE = "CURRENT"
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+# Checked longest first; a stem keeps at least 2 letters
+_PREFIXES = ("بال", "كال", "فال", "لل", "ال")
+_SUFFIXES = ("ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+_STOPWORDS = frozenset(normalize_arabic(word) for word in (
+    "في من على إلى عن مع هذا هذه ذلك التي الذي هو هي أن إن كان كانت ما لا لم لن قد ثم أو و يا "
+    "the a an and or of to in on for is are was were be with that this it as by at from"
+).split())
+
+
+def light_stem(word: str) -> str:
+    """Light10-style stem of a normalised Arabic word; other words pass through"""
+    if word.startswith("و") and len(word) >= 4:
+        word = word[1:]
+    for prefix in _PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+            word = word[len(prefix):]
+            break
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            word = word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalised, stemmed index terms without stopwords"""
+    return [light_stem(word) for word in _TOKEN.findall(normalize_arabic(text)) if word not in _STOPWORDS]
+
+
+def index_path(db_path: str) -> str:
+    return os.path.join(db_path, LEXICAL_INDEX_DIR)
+
+
+def current_version(path: str) -> Optional[str]:
+    """Name of the live version directory under `path`, None if no index was built"""
+    try:
+        with open(os.path.join(path, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def build_lexical_index(chunks: Iterable[Tuple[str, str, Dict]], db_path: str, kb_version: int = 0) -> int:
+    """Write the index for (chunk_id, text, metadata) chunks; returns the chunk count"""
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    ids, lengths, offsets = [], [], []
+    path = index_path(db_path)
+    version = f"{kb_version}-{time.time_ns()}"
+    tmp_path = os.path.join(path, version + ".tmp")
+    os.makedirs(tmp_path, exist_ok=True)
+
+    with open(os.path.join(tmp_path, "chunks.jsonl"), "wb") as f:
+        for number, (chunk_id, text, metadata) in enumerate(chunks):
+            terms = tokenize(text)
+            for term, count in Counter(terms).items():
+                postings.setdefault(term, []).append((number, count))
+            ids.append(chunk_id)
+            lengths.append(len(terms))
+            offsets.append(f.tell())
+            f.write(json.dumps({"text": text, "metadata": metadata or {}}, ensure_ascii=False).encode("utf-8"))
+            f.write(b"\n")
+        offsets.append(f.tell())
+
+    flat = array("I")
+    vocabulary = {}
+    for term in sorted(postings):
+        vocabulary[term] = [len(flat) // 2, len(postings[term])]
+        for number, count in postings[term]:
+            flat.extend((number, count))
+    with open(os.path.join(tmp_path, "postings.u32"), "wb") as f:
+        flat.tofile(f)
+
+    meta = {
+        "kb_version": kb_version,
+        "avg_length": sum(lengths) / len(lengths) if lengths else 0.0,
+        "ids": ids,
+        "lengths": lengths,
+        "offsets": offsets,
+        "terms": vocabulary,
+    }
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # Point CURRENT at the finished index so readers never see a half-written one
+    os.replace(tmp_path, os.path.join(path, version))
+    with open(os.path.join(path, CURRENT_FILE + ".tmp"), "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(os.path.join(path, CURRENT_FILE + ".tmp"), os.path.join(path, CURRENT_FILE))
+
+    # Older versions go once no process maps them; on Windows a running
+    # reader keeps its version until a later build removes it
+    for name in os.listdir(path):
+        if name not in (version, CURRENT_FILE):
+            target = os.path.join(path, name)
+            try:
+                shutil.rmtree(target) if os.path.isdir(target) else os.remove(target)
+            except OSError:
+                pass
+    return len(ids)
+
+
+class _Version:
+    """One mapped index version; closed once retired and no search is using it"""
+
+    def __init__(self, path: str, name: str):
+        self.name = name
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.files = []
+        self.maps = []
+        for file_name in ("postings.u32", "chunks.jsonl"):
+            f = open(os.path.join(path, file_name), "rb")
+            self.files.append(f)
+            size = os.fstat(f.fileno()).st_size
+            self.maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None)
+        self.postings = memoryview(self.maps[0]).cast("I") if self.maps[0] else memoryview(array("I"))
+        self.chunks = self.maps[1] if self.maps[1] else b""
+
+        self.kb_version = meta["kb_version"]
+        self.avg_length = meta["avg_length"] or 1.0
+        self.ids = meta["ids"]
+        self.numbers = {chunk_id: number for number, chunk_id in enumerate(self.ids)}
+        self.lengths = meta["lengths"]
+        self.offsets = meta["offsets"]
+        self.terms = meta["terms"]
+        self.users = 0
+        self.retired = False
+
+    def close(self) -> None:
+        self.postings.release()
+        for view in self.maps:
+            if view is not None:
+                view.close()
+        for f in self.files:
+            f.close()
+
+
+class LexicalIndex:
+    """Read side of the index: BM25 search and chunk lookup over mmapped files"""
+
+    def __init__(self, db_path: str):
+        self.path = index_path(db_path)
+        self._lock = threading.Lock()
+        self._version = self._open(current_version(self.path))
+
+    def _open(self, name: Optional[str]) -> _Version:
+        # Indexes built before CURRENT existed keep their files in self.path itself
+        return _Version(os.path.join(self.path, name) if name else self.path, name)
+
+    @property
+    def kb_version(self) -> int:
+        return self._version.kb_version
+
+    def refresh(self) -> bool:
+        """Reopen the index if ingest.py rebuilt it; True when it changed"""
+        name = current_version(self.path)
+        if name is None or name == self._version.name:
+            return False
+        with self._lock:
+            if name == self._version.name:
+                return True
+            old, self._version = self._version, self._open(name)
+            old.retired = True
+            if not old.users:
+                old.close()
+        return True
+
+    def _acquire(self) -> _Version:
+        with self._lock:
+            version = self._version
+            version.users += 1
+            return version
+
+    def _release(self, version: _Version) -> None:
+        with self._lock:
+            version.users -= 1
+            if version.retired and not version.users:
+                version.close()
+
+    def __len__(self) -> int:
+        return len(self._version.ids)
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[str, float]]:
+        """Top-k (chunk_id, BM25 score)"""
+        version = self._acquire()  # A concurrent refresh() leaves this version open until released
+        try:
+            ids, postings, lengths, avg_length = version.ids, version.postings, version.lengths, version.avg_length
+            total = len(ids)
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                entry = version.terms.get(term)
+                if entry is None:
+                    continue
+                start, count = entry
+                idf = math.log(1 + (total - count + 0.5) / (count + 0.5))
+                for i in range(2 * start, 2 * (start + count), 2):
+                    number, tf = postings[i], postings[i + 1]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[number] / avg_length)
+                    scores[number] = scores.get(number, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(ids[number], score) for number, score in best]
+        finally:
+            self._release(version)
+
+    def get(self, chunk_ids: Sequence[str]) -> Dict[str, Tuple[str, Dict]]:
+        """chunk_id -> (text, metadata) for the ids present in the index"""
+        version = self._acquire()
+        try:
+            found = {}
+            for chunk_id in chunk_ids:
+                number = version.numbers.get(chunk_id)
+                if number is None:
+                    continue
+                record = json.loads(bytes(version.chunks[version.offsets[number]:version.offsets[number + 1]]))
+                found[chunk_id] = (record["text"], record["metadata"])
+            return found
+        finally:
+            self._release(version)
+
+    def close(self) -> None:
+        with self._lock:
+            self._version.retired = True
+            if not self._version.users:
+                self._version.close()
+
+
+def open_lexical_index(db_path: str) -> Optional[LexicalIndex]:
+    """The index built by ingest.py, or None if there is none yet"""
+    path = index_path(db_path)
+    if current_version(path) is None and not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    return LexicalIndex(db_path)
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60) -> List[str]:
+    """Merge ranked id lists: each id scores sum(1 / (k + rank))"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
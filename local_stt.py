@@ -0,0 +1,194 @@
+"""Offline speech recognition: a quantised Whisper model on the CPU.
+
+Audio is cut into chunks at quiet points and the chunks are decoded in a
+process pool, so a long recording (or a long live utterance) is decoded while
+it is still being captured. No browser, no network: the recogniser and the
+translation hop of the Selenium path are both skipped, since the rest of the
+pipeline works on Arabic text directly.
+
+Needs `faster-whisper` (and `sounddevice` for the microphone).
+"""
+import os
+import queue
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from stt_engine import STTEngine, STT_SILENCE_GAP, query_modifier
+from tracing import span, traced
+
+LOCAL_STT_MODEL = os.getenv("LOCAL_STT_MODEL", "small")  # tiny | base | small | medium or a local path
+LOCAL_STT_COMPUTE_TYPE = os.getenv("LOCAL_STT_COMPUTE_TYPE", "int8")
+LOCAL_STT_LANGUAGE = os.getenv("LOCAL_STT_LANGUAGE", "ar")
+LOCAL_STT_WORKERS = int(os.getenv("LOCAL_STT_WORKERS", 2))  # Decoder processes
+LOCAL_STT_CHUNK_SECONDS = float(os.getenv("LOCAL_STT_CHUNK_SECONDS", 15))
+LOCAL_STT_SPEECH_RMS = float(os.getenv("LOCAL_STT_SPEECH_RMS", 0.01))  # Energy above which a frame is speech
+
+SAMPLE_RATE = 16000  # What Whisper expects
+_FRAME = SAMPLE_RATE * 30 // 1000  # 30 ms analysis frames
+
+
+# Decoder processes
+_model = None
+
+
+def _load_model(model_name, compute_type):
+    global _model
+    from faster_whisper import WhisperModel
+    # One thread per process: the pool provides the parallelism
+    _model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=1)
+
+
+def _decode_chunk(samples, language):
+    segments, _ = _model.transcribe(samples, language=language, beam_size=1, vad_filter=False)
+    return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+# Audio helpers
+def read_wav(path):
+    """Mono float32 samples at 16 kHz from a PCM WAV file"""
+    with wave.open(path, "rb") as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported sample width: {width * 8} bits")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return resample(samples, rate)
+
+
+def resample(samples, rate):
+    """Linear resampling to 16 kHz (good enough for speech recognition)"""
+    if rate == SAMPLE_RATE or not len(samples):
+        return samples.astype(np.float32)
+    target = int(round(len(samples) * SAMPLE_RATE / rate))
+    positions = np.linspace(0, len(samples) - 1, target)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _frame_rms(samples):
+    frames = len(samples) // _FRAME
+    if not frames:
+        return np.zeros(0, dtype=np.float32)
+    blocks = samples[:frames * _FRAME].reshape(frames, _FRAME)
+    return np.sqrt((blocks ** 2).mean(axis=1))
+
+
+def quiet_cut(samples, max_seconds=LOCAL_STT_CHUNK_SECONDS):
+    """Sample index to cut at: the quietest frame in the last third of the window,
+    so a chunk boundary does not split a word"""
+    limit = min(len(samples), int(max_seconds * SAMPLE_RATE))
+    rms = _frame_rms(samples[:limit])
+    if len(rms) < 3:
+        return limit
+    start = 2 * len(rms) // 3
+    return (start + int(np.argmin(rms[start:]))) * _FRAME + _FRAME // 2
+
+
+def split_on_silence(samples, max_seconds=LOCAL_STT_CHUNK_SECONDS):
+    """Chunks of at most `max_seconds`, cut at quiet points"""
+    chunks = []
+    max_samples = int(max_seconds * SAMPLE_RATE)
+    while len(samples) > max_samples:
+        cut = quiet_cut(samples, max_seconds)
+        chunks.append(samples[:cut])
+        samples = samples[cut:]
+    if len(samples):
+        chunks.append(samples)
+    return chunks
+
+
+class LocalWhisperSTTEngine(STTEngine):
+    """Whisper (CTranslate2, int8) decoding chunks in parallel worker processes"""
+
+    name = "local"
+
+    def __init__(self, model=LOCAL_STT_MODEL, workers=LOCAL_STT_WORKERS, language=LOCAL_STT_LANGUAGE,
+                 compute_type=LOCAL_STT_COMPUTE_TYPE, chunk_seconds=LOCAL_STT_CHUNK_SECONDS):
+        self.language = language
+        self.chunk_seconds = chunk_seconds
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_load_model, initargs=(model, compute_type)
+        )
+
+    def warmup(self):
+        """Load the model in every worker ahead of the first turn"""
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        futures = [self._executor.submit(_decode_chunk, silence, self.language)
+                   for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def _submit(self, samples):
+        return self._executor.submit(_decode_chunk, samples, self.language)
+
+    def transcribe_samples(self, samples):
+        futures = [self._submit(chunk) for chunk in split_on_silence(samples, self.chunk_seconds)]
+        return self._join(futures)
+
+    @traced("stt.transcribe_file")
+    def transcribe_file(self, audio_path):
+        return self.transcribe_samples(read_wav(audio_path))
+
+    @traced("stt.listen")
+    def listen(self, timeout=20):
+        """Record from the default microphone until a pause ends the utterance.
+
+        Full chunks are handed to the decoders while the user is still
+        speaking, so only the last chunk is decoded after they stop.
+        """
+        import sounddevice as sd
+
+        blocks = queue.Queue()
+        buffered = np.zeros(0, dtype=np.float32)
+        futures = []
+        heard_speech = False
+        last_speech = started = time.monotonic()
+        max_samples = int(self.chunk_seconds * SAMPLE_RATE)
+
+        def on_audio(indata, frames, time_info, status):
+            blocks.put(indata[:, 0].copy())
+
+        with sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype="float32",
+                            blocksize=_FRAME * 4, callback=on_audio):
+            while time.monotonic() - started < timeout:
+                try:
+                    block = blocks.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                now = time.monotonic()
+                if float(np.sqrt((block ** 2).mean())) > LOCAL_STT_SPEECH_RMS:
+                    heard_speech, last_speech = True, now
+                elif not heard_speech:
+                    continue  # Leading silence is not worth decoding
+                buffered = np.concatenate([buffered, block])
+
+                if len(buffered) >= max_samples:
+                    cut = quiet_cut(buffered, self.chunk_seconds)
+                    futures.append(self._submit(buffered[:cut]))
+                    buffered = buffered[cut:]
+                if now - last_speech >= STT_SILENCE_GAP:
+                    break
+
+        if heard_speech and len(buffered):
+            futures.append(self._submit(buffered))
+        return self._join(futures)
+
+    def _join(self, futures):
+        with span("stt.decode_wait"):  # Decoding still running after the audio ended
+            text = " ".join(part for part in (future.result() for future in futures) if part)
+        return query_modifier(text) if text else ""
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,49 +1,152 @@
 # main.py
-from enegine_2_arabic import respond  # Your chatbot logic
-from stt import get_recognized_text  # Speech-to-text
-from tts import speak  # Text-to-speech
+from enegine_2_arabic import stream_respond, CRISIS_REPLY, warmup, readiness, fixed_phrases  # Your chatbot logic
+from stt_engine import get_stt_engine, STT_ENGINE  # Speech-to-text
+from tts import StreamingSpeaker, speak_stream, prerender  # Text-to-speech
 import gradio as gr
-from crisis_detection import CrisisDetectorWithEmail
+import threading
+import time
+from crisis_detection import get_crisis_detector
+from serving import serve_turn, SERVE_CONCURRENCY, SERVE_QUEUE_SIZE
+import components
+import os
+import tracing
 
+# "local": the server's own microphone and speakers (single user at the host)
+# "browser": each client records in the browser and gets the reply audio back
+SERVING_MODE = os.getenv("SERVING_MODE", "local")
 
-def process_voice():
-    """Mimics terminal behavior but in Gradio"""
+
+def process_voice(request: gr.Request):
+    """Mimics terminal behavior but in Gradio, streaming text and speech"""
+    # A generator may be resumed on another thread, so the turn id is set
+    # around each blocking step instead of once around the whole turn
+    turn_id = tracing.new_turn_id()
     try:
         # 1. Listen for voice input (auto-triggered)
-        user_text = get_recognized_text()
+        with tracing.turn(turn_id):
+            user_text = get_stt_engine().listen()
         if not user_text:
-            return "Could not detect speech. Try again."
+            yield "Could not detect speech. Try again."
+            return
+
+        turn_started = time.perf_counter()
+        session_id = request.session_hash
+        detector = get_crisis_detector()
+        with tracing.turn(turn_id):
+            is_crisis, details = detector.detect_crisis(user_text, session_id=session_id)
+
+        # Crisis turns skip the LLMs entirely and get the hotline right away
+        if is_crisis:
+            yield f"👤 You: {user_text}\n\n🤖 Bot: {CRISIS_REPLY}\n\n{details['response']}"
+            with tracing.turn(turn_id):
+                speak_stream([CRISIS_REPLY], started_at=turn_started, session_id=session_id)
+            return
+
+        # 2. Generate the response and 3. speak each sentence as it completes
+        with tracing.turn(turn_id):
+            speaker = StreamingSpeaker(started_at=turn_started, session_id=session_id)
+        bot_response = ""
+        try:
+            for chunk in tracing.iterate(stream_respond(user_text, session_id=session_id), turn_id):
+                bot_response += chunk
+                speaker.feed(chunk)
+                yield f"👤 You: {user_text}\n\n🤖 Bot: {bot_response}"
+        finally:
+            speaker.finish()
+
+        first_audio = speaker.wait()
+        with tracing.turn(turn_id):
+            tracing.record("turn", time.perf_counter() - turn_started, started=turn_started)
+        if first_audio is not None:
+            print(f"Time to first audio: {first_audio:.2f}s")
+
+        yield f"👤 You: {user_text}\n\n🤖 Bot: {bot_response}"
+
+    except Exception as e:
+        yield f"Error: {str(e)}"
 
-        detector = CrisisDetectorWithEmail()
-        is_crisis, details = detector.detect_crisis(user_text)
 
-        # 2. Generate response
-        bot_response = respond(user_text, history=None)
+def process_audio(audio_path, request: gr.Request):
+    """Browser mode: transcribe the uploaded recording and return text + reply audio"""
+    if not audio_path:
+        return "Could not detect speech. Try again.", None
+    try:
+        user_text, bot_response, audio = serve_turn(audio_path, request.session_hash)
+    except Exception as e:
+        return f"Error: {str(e)}", None
 
+    if not user_text:
+        return "Could not detect speech. Try again.", None
 
+    # Gradio writes the bytes into its own cache, which it cleans up
+    return f"👤 You: {user_text}\n\n🤖 Bot: {bot_response}", audio
 
-        # 3. Speak the response
-        speak(bot_response)
 
-        return f"👤 You: {user_text}\n\n🤖 Bot: {bot_response}"
+def readiness_text():
+    """Model loading state shown in the UI"""
+    state = readiness()
+    if state["state"] == "ready":
+        return f"✅ Ready (loaded in {state['seconds']:.1f}s)"
+    if state["state"] == "failed":
+        return f"⚠️ Knowledge base unavailable, using fallback: {state['error']}"
+    return "⏳ Loading models..."
 
+
+def _warmup_all():
+    warmup()
+    try:
+        print(f"Pre-rendered {prerender(fixed_phrases())} fixed phrases")
     except Exception as e:
-        return f"Error: {str(e)}"
+        print(f"TTS phrase bank failed: {e}")
+    # Browser mode with Selenium starts one Chrome per recording, so there is nothing to warm
+    if SERVING_MODE == "local" or STT_ENGINE == "local":
+        try:
+            get_stt_engine().warmup()
+        except Exception as e:
+            print(f"STT warmup failed: {e}")
+
+
+# Build cheap shared components now; load models in the background so the UI serves immediately
+for name, seconds in components.startup("crisis_detector").items():
+    print(f"Built {name} in {seconds:.3f}s")
+get_crisis_detector().start_alerts()  # Deliver alerts a previous run left pending
+threading.Thread(target=_warmup_all, name="warmup", daemon=True).start()
+if tracing.METRICS_PORT:
+    tracing.start_metrics_server(int(tracing.METRICS_PORT))
 
 
 # Simple Gradio UI
 with gr.Blocks(title="Voice Counselor", theme=gr.themes.Soft()) as app:
     gr.Markdown("## 🎤 Islamic Voice Counselor")
     gr.Markdown("*Speak now - it's listening automatically*")
+    status = gr.Markdown(readiness_text())
 
-    # Auto-triggered voice input
     output = gr.Textbox(label="Conversation", interactive=False)
-    record_btn = gr.Button("Start Listening", variant="primary")
 
-    record_btn.click(
-        fn=process_voice,
-        outputs=output
-    )
+    if SERVING_MODE == "browser":
+        # Client-side microphone; every session is processed independently
+        mic = gr.Audio(sources=["microphone"], type="filepath", label="Your voice")
+        reply_audio = gr.Audio(label="Reply", format="mp3", autoplay=True, interactive=False)
+        mic.stop_recording(
+            fn=process_audio,
+            inputs=mic,
+            outputs=[output, reply_audio]
+        )
+    else:
+        # Auto-triggered voice input
+        record_btn = gr.Button("Start Listening", variant="primary")
 
-app.launch()
+        record_btn.click(
+            fn=process_voice,
+            outputs=output
+        )
+    app.load(fn=readiness_text, outputs=status, every=2)
 
+# The only admission control: turns beyond the concurrency limit wait here and
+# Gradio turns requests away once max_size are waiting. Local mode drives a
+# single microphone, so only one turn may run at a time
+app.queue(
+    max_size=SERVE_QUEUE_SIZE,
+    default_concurrency_limit=SERVE_CONCURRENCY if SERVING_MODE == "browser" else 1
+)
+app.launch()
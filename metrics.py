@@ -0,0 +1,76 @@
+import threading
+from typing import Dict, List
+
+
+class Histogram:
+    """Thread-safe record of observed values (seconds, tokens, ...) with percentiles"""
+
+    def __init__(self, name: str, max_samples: int = 10000):
+        self.name = name
+        self.max_samples = max_samples
+        self._samples: List[float] = []
+        self._count = 0
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._count += 1
+            self._total += value
+            if len(self._samples) >= self.max_samples:
+                # Keep memory bounded: overwrite in ring order
+                self._samples[self._count % self.max_samples] = value
+            else:
+                self._samples.append(value)
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, max(0, int(round(q / 100 * (len(samples) - 1)))))
+        return samples[index]
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            count, total = self._count, self._total
+        return {
+            'count': count,
+            'mean': total / count if count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples = []
+            self._count = 0
+            self._total = 0.0
+
+
+_histograms: Dict[str, Histogram] = {}
+_registry_lock = threading.Lock()
+
+
+def get_histogram(name: str) -> Histogram:
+    """Return the process-wide histogram called `name`, creating it on first use"""
+    with _registry_lock:
+        if name not in _histograms:
+            _histograms[name] = Histogram(name)
+        return _histograms[name]
+
+
+def reset() -> None:
+    """Clear every histogram (benchmarks discard their warm-up turns)"""
+    with _registry_lock:
+        histograms = list(_histograms.values())
+    for h in histograms:
+        h.reset()
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """Summaries of every histogram recorded so far"""
+    with _registry_lock:
+        histograms = list(_histograms.values())
+    return {h.name: h.summary() for h in histograms}
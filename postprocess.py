@@ -0,0 +1,124 @@
+"""Reply post-processing compiled from a declarative rule set.
+
+Rules come in three kinds:
+  * classifiers: label -> keywords/phrases looked for in the user's query
+  * rewrites: academic markers stripped (format stage) and the dialect
+    rewrite (cultural stage), applied to the LLM text
+  * inserts: fixed or randomly chosen phrases added before/after the reply
+    when the query carries certain labels
+
+Everything is compiled once. A reply then costs one automaton pass over the
+query, one pass per rewrite over the LLM text and a single join.
+"""
+import os
+import random
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple, Union
+
+from arabic_text import PhraseMatcher
+from tracing import traced
+
+# Old pipeline order: format_response -> apply_cultural_adjustment -> enhance_therapeutic_quality
+STAGES = ("format", "cultural", "therapeutic")
+POSTPROCESS_SEED = os.getenv("POSTPROCESS_SEED")  # Set for reproducible openers/fillers
+
+
+class Insert:
+    """A phrase (or a random pick from a bank) added before or after the reply.
+
+    Later stages wrap earlier ones, as the old chain did: prefixes of a later
+    stage go further out, suffixes of a later stage further back.
+    """
+
+    def __init__(self, stage: str, position: str, phrases: Union[str, Sequence[str]],
+                 when: Optional[Iterable[str]] = None, joiner: str = " ", dialect: bool = False):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+        if position not in ("prefix", "suffix"):
+            raise ValueError(f"Unknown position: {position}")
+        self.stage = stage
+        self.position = position
+        self.phrases = [phrases] if isinstance(phrases, str) else list(phrases)
+        self.when = frozenset(when) if when else None  # Any of these labels; None = always
+        self.joiner = joiner
+        self.dialect = dialect  # Passes through the dialect rewrite when the cultural stage runs
+        self.rewritten = self.phrases
+
+    def applies(self, labels: FrozenSet[str]) -> bool:
+        return self.when is None or not self.when.isdisjoint(labels)
+
+    def pick(self, rng: random.Random, rewritten: bool) -> str:
+        bank = self.rewritten if rewritten else self.phrases
+        phrase = bank[0] if len(bank) == 1 else rng.choice(bank)
+        return phrase + self.joiner if self.position == "prefix" else self.joiner + phrase
+
+
+class PostProcessor:
+    def __init__(self, classifiers: Dict[str, Iterable[str]], inserts: List[Insert],
+                 strip: Iterable[str] = (), rewriter=None, seed=POSTPROCESS_SEED):
+        labels_by_phrase: Dict[str, set] = {}
+        for label, phrases in classifiers.items():
+            for phrase in phrases:
+                labels_by_phrase.setdefault(phrase, set()).add(label)
+        self._labels_by_phrase = labels_by_phrase
+        self._matcher = PhraseMatcher(labels_by_phrase)
+
+        markers = [marker for marker in strip if marker]
+        self._strip = re.compile("|".join(map(re.escape, markers))) if markers else None
+        self.rewriter = rewriter
+
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        self._prefixes = sorted((i for i in inserts if i.position == "prefix"), key=lambda i: -order[i.stage])
+        self._suffixes = sorted((i for i in inserts if i.position == "suffix"), key=lambda i: order[i.stage])
+        for insert in inserts:
+            if insert.dialect and rewriter is not None:
+                insert.rewritten = [rewriter.rewrite(phrase) for phrase in insert.phrases]
+
+        self.classify = lru_cache(maxsize=1024)(self._classify)
+        self.reseed(seed)
+
+    def reseed(self, seed=None) -> None:
+        """Restart the random phrase choices (same seed -> same choices)"""
+        self._rng = random.Random(seed)
+
+    def _classify(self, query: str) -> FrozenSet[str]:
+        """Labels of every classifier with a phrase in `query` (one pass)"""
+        labels = set()
+        for phrase in self._matcher.matched_phrases(query or ""):
+            labels.update(self._labels_by_phrase[phrase])
+        return frozenset(labels)
+
+    def strip(self, text: str) -> str:
+        return self._strip.sub("", text) if self._strip else text
+
+    def affixes(self, query: str, stages: Sequence[str] = STAGES,
+                rng: random.Random = None) -> Tuple[List[str], List[str]]:
+        """Prefix and suffix pieces the given stages would add around the reply"""
+        rng = rng or self._rng
+        labels = self.classify(query)
+        rewritten = "cultural" in stages and self.rewriter is not None
+        prefix = [i.pick(rng, rewritten and i.dialect) for i in self._prefixes
+                  if i.stage in stages and i.applies(labels)]
+        suffix = [i.pick(rng, rewritten and i.dialect) for i in self._suffixes
+                  if i.stage in stages and i.applies(labels)]
+        return prefix, suffix
+
+    @traced("postprocess")
+    def process(self, text: str, query: str, stages: Sequence[str] = STAGES, rng: random.Random = None) -> str:
+        """Run the given stages over an LLM reply in one go"""
+        if "format" in stages:
+            text = self.strip(text)
+        if "cultural" in stages and self.rewriter is not None:
+            text = self.rewriter.rewrite(text)
+        prefix, suffix = self.affixes(query, stages, rng)
+        return "".join(prefix + [text] + suffix)
+
+    def phrases(self) -> List[str]:
+        """Every fixed phrase an insert can add, as it appears in replies"""
+        seen = []
+        for insert in self._prefixes + self._suffixes:
+            for phrase in (insert.rewritten if insert.dialect else insert.phrases):
+                if phrase.strip() not in seen:
+                    seen.append(phrase.strip())
+        return seen
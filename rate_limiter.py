@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from metrics import get_histogram
+from tracing import span
+
+# Set to a file path to share quotas between several app worker processes
+RATE_LIMIT_STATE_PATH = os.getenv("RATE_LIMIT_STATE_PATH")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (Arabic runs ~3 characters per token)"""
+    return max(1, len(text) // 3)
+
+
+class MemoryBucketStore:
+    """Bucket levels for this process only"""
+
+    def __init__(self):
+        self._levels: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, name: str, cost: float, rate: float, capacity: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._levels.get(name, (capacity, now))
+            tokens, wait = _take(tokens, updated, now, cost, rate, capacity)
+            self._levels[name] = (tokens, now)
+            return wait
+
+
+class SQLiteBucketStore:
+    """Bucket levels shared by every process using the same database file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.db = db
+        return db
+
+    def reserve(self, name: str, cost: float, rate: float, capacity: float) -> float:
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")  # Serialises reservations across processes
+        try:
+            now = time.time()
+            row = db.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens, wait = _take(tokens, updated, now, cost, rate, capacity)
+            db.execute("INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)", (name, tokens, now))
+            db.execute("COMMIT")
+            return wait
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+def _take(tokens, updated, now, cost, rate, capacity):
+    """Refill, then reserve `cost` tokens; a negative balance is a queue of future reservations"""
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    tokens -= cost
+    wait = 0.0 if tokens >= 0 else -tokens / rate
+    return tokens, wait
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SQLiteBucketStore(RATE_LIMIT_STATE_PATH) if RATE_LIMIT_STATE_PATH else MemoryBucketStore()
+        return _default_store
+
+
+class RateLimiter:
+    """Token-bucket limiter for one provider: requests/minute plus optional tokens/minute.
+
+    `burst` requests may go out back to back before the per-minute rate kicks
+    in. Waiters reserve their slot under a lock, so concurrent threads never
+    fire on the same budget. `wait()` sleeps in the calling thread, so a
+    throttled turn keeps its Gradio worker busy until its slot comes up.
+    """
+
+    def __init__(self, calls_per_minute: float, tokens_per_minute: Optional[float] = None,
+                 burst: float = 1, name: str = "default", store=None):
+        self.name = name
+        self.calls_per_minute = calls_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.burst = burst
+        self.store = store or default_store()
+        self.wait_histogram = get_histogram(f"ratelimit.{name}.wait_seconds")
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Claim a request (and `tokens` LLM tokens); returns seconds to wait before sending"""
+        wait = self.store.reserve(f"{self.name}:rpm", 1, self.calls_per_minute / 60, self.burst)
+        if self.tokens_per_minute and tokens:
+            wait = max(wait, self.store.reserve(
+                f"{self.name}:tpm", tokens, self.tokens_per_minute / 60, self.tokens_per_minute
+            ))
+        self.wait_histogram.observe(wait)
+        return wait
+
+    def wait(self, tokens: int = 0) -> None:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            with span(f"ratelimit.{self.name}"):
+                time.sleep(delay)
@@ -0,0 +1,143 @@
+"""Semantic cache of whole replies for recurring questions.
+
+Paraphrases of the same concern ("ما أقدر أنام", "عندي أرق") land close
+together in embedding space, so a validated answer can be reused for any
+query whose embedding is similar enough. The cache holds the raw LLM answer:
+post-processing (openers, particles, therapeutic inserts) still runs on
+every hit, so repeated questions do not get word-for-word identical replies.
+
+Entries expire after a TTL; the least recently used are evicted once the
+cache holds more than `max_bytes`.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import get_histogram
+
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "0") == "1"  # Opt-in
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", 0.93))  # Cosine similarity for a hit
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 24 * 3600))  # Seconds
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", 32 * 1024 * 1024))
+
+
+class _Entry:
+    __slots__ = ("query", "answer", "llm_calls", "row", "created", "size")
+
+    def __init__(self, query: str, answer: str, llm_calls: int, row: int, size: int):
+        self.query = query
+        self.answer = answer
+        self.llm_calls = llm_calls
+        self.row = row
+        self.created = time.monotonic()
+        self.size = size
+
+
+class ResponseCache:
+    """Answers keyed by query embedding, looked up by cosine similarity.
+
+    Vectors are kept normalised in one contiguous matrix, so a lookup is a
+    single matrix-vector product over every live entry.
+    """
+
+    def __init__(self, embeddings, threshold: float = RESPONSE_CACHE_THRESHOLD, ttl: float = RESPONSE_CACHE_TTL,
+                 max_bytes: int = RESPONSE_CACHE_BYTES):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._vectors: Optional[np.ndarray] = None  # Rows 0..len(_rows)-1 are live
+        self._rows: List[int] = []  # Row -> entry id
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()  # Least recently used first
+        self._next_id = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.llm_calls_saved = 0
+
+    def embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def lookup(self, vector: np.ndarray) -> Optional[Tuple[str, int]]:
+        """(answer, LLM calls it took) cached for the closest query above the threshold, if any"""
+        with self._lock:
+            entry = self._lookup(vector)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        get_histogram("response_cache.hit").observe(entry is not None)
+        return (entry.answer, entry.llm_calls) if entry is not None else None
+
+    def _lookup(self, vector: np.ndarray) -> Optional[_Entry]:
+        while self._rows:
+            scores = self._vectors[:len(self._rows)] @ vector
+            row = int(np.argmax(scores))
+            if scores[row] < self.threshold:
+                return None
+            entry_id = self._rows[row]
+            entry = self._entries[entry_id]
+            if time.monotonic() - entry.created > self.ttl:
+                self._remove(entry_id)
+                continue  # The next best may still be fresh
+            self._entries.move_to_end(entry_id)
+            return entry
+        return None
+
+    def put(self, query: str, vector: np.ndarray, answer: str, llm_calls: int = 1) -> None:
+        """Store a validated answer; `llm_calls` is what producing it cost (primary + validation)"""
+        size = vector.nbytes + sys.getsizeof(query) + sys.getsizeof(answer)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.empty((16, len(vector)), dtype=np.float32)
+            elif len(self._rows) == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.empty_like(self._vectors)])
+            row = len(self._rows)
+            self._vectors[row] = vector
+            self._rows.append(self._next_id)
+            self._entries[self._next_id] = _Entry(query, answer, llm_calls, row, size)
+            self._next_id += 1
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int) -> None:
+        """Drop an entry; the last row moves into its slot so live rows stay contiguous"""
+        entry = self._entries.pop(entry_id)
+        self._bytes -= entry.size
+        last = len(self._rows) - 1
+        if entry.row != last:
+            moved_id = self._rows[last]
+            self._vectors[entry.row] = self._vectors[last]
+            self._rows[entry.row] = moved_id
+            self._entries[moved_id].row = entry.row
+        self._rows.pop()
+
+    def count_saved(self, calls: int) -> None:
+        with self._lock:
+            self.llm_calls_saved += calls
+
+    def memory_bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "llm_calls_saved": self.llm_calls_saved,
+            }
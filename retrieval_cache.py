@@ -0,0 +1,202 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from arabic_text import normalize_arabic
+from ingest import manifest_path, knowledge_base_version
+from lexical_index import reciprocal_rank_fusion
+
+RETRIEVAL_CACHE_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_ENTRIES", 2048))
+RETRIEVAL_CACHE_BYTES = int(os.getenv("RETRIEVAL_CACHE_BYTES", 32 * 1024 * 1024))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", 6 * 3600))  # Seconds
+
+_WORDS = re.compile(r"\w+")
+
+
+def cache_key(query: str) -> str:
+    """Arabic-normalised query with punctuation and extra spaces removed"""
+    return " ".join(_WORDS.findall(normalize_arabic(query)))
+
+
+class _Entry:
+    __slots__ = ("vector", "chunk_ids", "kb_version", "created_at", "size")
+
+    def __init__(self, vector: np.ndarray):
+        self.vector = vector  # float32: 4 bytes a dimension instead of ~32 for a list of floats
+        self.chunk_ids: Optional[List[str]] = None
+        self.kb_version: Optional[int] = None
+        self.created_at = time.time()
+        self.size = vector.nbytes + 200  # Array header, entry object and key
+
+
+class RetrievalCache:
+    """LRU + TTL cache of query embeddings and their top-k chunk ids.
+
+    Memory is bounded by both entry count and (estimated) bytes. Chunk ids are
+    only served for the knowledge-base version they were computed against.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_ENTRIES,
+                 max_bytes: int = RETRIEVAL_CACHE_BYTES, ttl: float = RETRIEVAL_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._kb_mtime = None
+        self._kb_version = 0
+        self.hits = 0
+        self.embedding_hits = 0
+        self.misses = 0
+
+    def lookup(self, key: str, kb_version: int):
+        """Return (vector, chunk_ids); either may be None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry.created_at > self.ttl:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if entry.chunk_ids is not None and entry.kb_version == kb_version:
+                self.hits += 1
+                return entry.vector, entry.chunk_ids
+            self.embedding_hits += 1
+            return entry.vector, None
+
+    def store(self, key: str, vector, chunk_ids: List[str], kb_version: int) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            entry = _Entry(np.asarray(vector, dtype=np.float32))
+            entry.chunk_ids = list(chunk_ids)
+            entry.kb_version = kb_version
+            entry.size += 56 + sum(8 + len(chunk_id) + 49 for chunk_id in chunk_ids)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def sync_kb_version(self) -> int:
+        """Current knowledge-base version; re-reads the manifest only when it changed on disk"""
+        try:
+            mtime = os.stat(manifest_path()).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._kb_mtime:
+            self._kb_mtime = mtime
+            self._kb_version = knowledge_base_version()
+            self.invalidate_results()
+        return self._kb_version
+
+    def invalidate_results(self) -> None:
+        """Forget cached chunk ids (the knowledge base changed); embeddings stay valid"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.chunk_ids = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "embedding_hits": self.embedding_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+class CachedRetriever(BaseRetriever):
+    """Drop-in replacement for `vector_db.as_retriever()` that skips
+    re-embedding and re-searching queries seen before.
+
+    With a lexical index, `mode` picks the search: "hybrid" fuses the dense
+    and BM25 rankings (reciprocal rank fusion), "lexical" uses BM25 only and
+    never touches the embedding model, "dense" ignores the index.
+    """
+
+    vector_db: Any = None
+    cache: Any
+    lexical: Any = None
+    mode: str = "dense"
+    k: int = 4
+    candidates: int = 10  # Results taken from each ranking before fusion
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        key = cache_key(query)
+        kb_version = self.cache.sync_kb_version()
+        if self.lexical is not None and self.lexical.refresh():
+            self.cache.invalidate_results()
+        vector, chunk_ids = self.cache.lookup(key, kb_version)
+
+        if chunk_ids is not None:
+            return self._documents_by_id(chunk_ids)
+
+        rankings = []
+        found = {}
+        if self.mode != "lexical":
+            if vector is None or not len(vector):
+                vector = self.vector_db.embeddings.embed_query(query)
+            result = self.vector_db._collection.query(
+                query_embeddings=[np.asarray(vector, dtype=np.float32).tolist()],
+                n_results=self.k if self.mode == "dense" else self.candidates,
+                include=["documents", "metadatas"]
+            )
+            rankings.append(result["ids"][0])
+            found = {
+                chunk_id: Document(page_content=text, metadata=metadata or {})
+                for chunk_id, text, metadata in zip(result["ids"][0], result["documents"][0], result["metadatas"][0])
+            }
+        if self.lexical is not None and self.mode != "dense":
+            rankings.append([chunk_id for chunk_id, _ in self.lexical.search(query, self.candidates)])
+
+        ids = reciprocal_rank_fusion(rankings)[:self.k] if len(rankings) > 1 else rankings[0][:self.k]
+        self.cache.store(key, vector if vector is not None else [], ids, kb_version)
+        if all(chunk_id in found for chunk_id in ids):
+            return [found[chunk_id] for chunk_id in ids]
+        return self._documents_by_id(ids)
+
+    def _documents_by_id(self, chunk_ids: List[str]) -> List[Document]:
+        if self.lexical is not None:
+            # Chunk texts are memory-mapped with the index: no vector store round-trip
+            by_id = {
+                chunk_id: Document(page_content=text, metadata=metadata or {})
+                for chunk_id, (text, metadata) in self.lexical.get(chunk_ids).items()
+            }
+        else:
+            found = self.vector_db.get(ids=chunk_ids, include=["documents", "metadatas"])
+            by_id = {
+                chunk_id: Document(page_content=text, metadata=metadata or {})
+                for chunk_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+            }
+        return [by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in by_id]
+
+
+def build_cached_retriever(vector_db, k: int = 4, cache: RetrievalCache = None,
+                           lexical=None, mode: str = "dense") -> CachedRetriever:
+    if lexical is None and mode != "dense":
+        print("No lexical index found - falling back to dense retrieval (run ingest.py to build it)")
+        mode = "dense"
+    return CachedRetriever(vector_db=vector_db, cache=cache or RetrievalCache(), lexical=lexical, mode=mode, k=k)
@@ -0,0 +1,41 @@
+"""Multi-user serving: the browser records audio, the server runs
+STT -> respond -> TTS per session and returns the reply audio.
+
+Admission is left to Gradio's queue (main.py): SERVE_CONCURRENCY turns run
+at once, SERVE_QUEUE_SIZE wait, and Gradio rejects the rest.
+"""
+import asyncio
+import os
+import time
+from typing import Callable, Optional, Tuple
+
+from crisis_detection import get_crisis_detector
+from enegine_2_arabic import respond, CRISIS_REPLY
+from metrics import get_histogram
+from stt_engine import get_stt_engine
+import tracing
+import tts
+
+SERVE_CONCURRENCY = int(os.getenv("SERVE_CONCURRENCY", 4))  # Turns processed at once
+SERVE_QUEUE_SIZE = int(os.getenv("SERVE_QUEUE_SIZE", 32))  # Turns waiting before new ones are rejected
+
+
+def serve_turn(audio_path: str, session_id: str,
+               transcribe: Optional[Callable[[str], str]] = None) -> Tuple[str, str, bytes]:
+    """Run one voice turn for a session; returns (user_text, reply_text, reply_mp3)"""
+    transcribe = transcribe or get_stt_engine().transcribe_file
+    started = time.perf_counter()
+
+    with tracing.turn():
+        user_text = transcribe(audio_path)
+        if not user_text:
+            return "", "", b""
+
+        is_crisis, _ = get_crisis_detector().detect_crisis(user_text, session_id=session_id)
+        reply = CRISIS_REPLY if is_crisis else respond(user_text, None, session_id=session_id)
+        audio = asyncio.run(tts.synthesize_response(reply))
+
+        seconds = time.perf_counter() - started
+        get_histogram("serve.turn_seconds").observe(seconds)
+        tracing.record("turn", seconds, started=started)
+    return user_text, reply, audio
@@ -0,0 +1,145 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from rate_limiter import estimate_tokens
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 600))  # Recent turns kept verbatim
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", 150))  # Rolling summary of older turns
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", 1800))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 1000))
+
+_FIRST_CLAUSE = re.compile(r"[^.!?؟،\n]+")
+
+
+def extractive_summary(user: str, bot: str) -> str:
+    """One short line per compressed turn: the user's first clause (no LLM call)"""
+    match = _FIRST_CLAUSE.search(user)
+    concern = (match.group() if match else user).strip()[:80]
+    return f"- المستخدم ذكر: {concern}"
+
+
+class Session:
+    __slots__ = ("turns", "summary", "turn_tokens", "last_seen")
+
+    def __init__(self):
+        self.turns: deque = deque()  # (user, bot, tokens)
+        self.summary: deque = deque()  # (line, tokens)
+        self.turn_tokens = 0
+        self.last_seen = time.monotonic()
+
+    def footprint(self) -> int:
+        """Approximate bytes held by this session"""
+        size = sys.getsizeof(self.turns) + sys.getsizeof(self.summary)
+        size += sum(sys.getsizeof(user) + sys.getsizeof(bot) for user, bot, _ in self.turns)
+        size += sum(sys.getsizeof(line) for line, _ in self.summary)
+        return size
+
+
+class SessionStore:
+    """Conversation state per Gradio session with a constant-size prompt window.
+
+    Recent turns are kept verbatim up to `history_tokens`; older turns are
+    folded into a rolling summary capped at `summary_tokens`, so the history
+    part of the prompt stays roughly constant however long the conversation
+    runs. Idle sessions are evicted, and at most `max_sessions` are kept.
+    """
+
+    def __init__(self, history_tokens: int = HISTORY_TOKEN_BUDGET, summary_tokens: int = SUMMARY_TOKEN_BUDGET,
+                 idle_seconds: float = SESSION_IDLE_SECONDS, max_sessions: int = MAX_SESSIONS,
+                 summarizer: Callable[[str, str], str] = extractive_summary):
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self.summarizer = summarizer
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def _session(self, session_id: str) -> Session:
+        # Called with the lock held
+        now = time.monotonic()
+        if now - self._last_sweep > 60:
+            self._evict_idle(now)
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = Session()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        session.last_seen = now
+        return session
+
+    def _evict_idle(self, now: float) -> None:
+        self._last_sweep = now
+        for session_id in [sid for sid, s in self._sessions.items() if now - s.last_seen > self.idle_seconds]:
+            del self._sessions[session_id]
+
+    def record_turn(self, session_id: str, user: str, bot: str) -> None:
+        # A single long reply must not take the whole window (~3 chars per token)
+        max_chars = 3 * self.history_tokens // 2
+        user, bot = user[:max_chars], bot[:max_chars]
+        with self._lock:
+            session = self._session(session_id)
+            tokens = estimate_tokens(user) + estimate_tokens(bot)
+            session.turns.append((user, bot, tokens))
+            session.turn_tokens += tokens
+
+            # Fold the oldest turns into the summary until the window fits
+            while session.turn_tokens > self.history_tokens and len(session.turns) > 1:
+                old_user, old_bot, old_tokens = session.turns.popleft()
+                session.turn_tokens -= old_tokens
+                line = self.summarizer(old_user, old_bot)
+                session.summary.append((line, estimate_tokens(line)))
+                while sum(t for _, t in session.summary) > self.summary_tokens and len(session.summary) > 1:
+                    session.summary.popleft()
+
+    def history_text(self, session_id: str) -> str:
+        with self._lock:
+            if session_id not in self._sessions:
+                return ""
+            session = self._session(session_id)
+            return format_history(
+                [line for line, _ in session.summary],
+                [(user, bot) for user, bot, _ in session.turns]
+            )
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sys.getsizeof(self._sessions) + sum(s.footprint() for s in self._sessions.values())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+def format_history(summary: List[str], turns: Iterable[Tuple[str, str]]) -> str:
+    parts = []
+    if summary:
+        parts.append("ملخص ما سبق:\n" + "\n".join(summary))
+    for user, bot in turns:
+        parts.append(f"المستخدم: {user}\nالمستشار: {bot}")
+    return "\n\n".join(parts)
+
+
+def window_history(history: Optional[List], history_tokens: int = HISTORY_TOKEN_BUDGET) -> str:
+    """Most recent (user, bot) pairs from a Gradio-style history that fit the budget"""
+    if not history:
+        return ""
+    kept = []
+    used = 0
+    for user, bot in reversed(history):
+        tokens = estimate_tokens(user or "") + estimate_tokens(bot or "")
+        if kept and used + tokens > history_tokens:
+            break
+        kept.append((user or "", bot or ""))
+        used += tokens
+    return format_history([], reversed(kept))
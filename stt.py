@@ -4,13 +4,26 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import dotenv_values
+from contextlib import contextmanager
+from functools import lru_cache
+from collections import deque
+import atexit
+from tracing import traced
 import os
+import threading
 import time
-import mtranslate as mt
+from translation import route
+from stt_engine import STT_SILENCE_GAP, STTEngine, query_modifier
 
 # Load environment variables
 env_vars = dotenv_values(".env")
 InputLanguage = env_vars.get("InputLanguage", "en-US")  # Default to English
+STT_POOL_SIZE = int(env_vars.get("STT_POOL_SIZE", 2))  # Warm Chrome sessions
+STT_POOL_MAX_USES = int(env_vars.get("STT_POOL_MAX_USES", 50))  # Recycle after N turns
+STT_POOL_TIMEOUT = float(env_vars.get("STT_POOL_TIMEOUT", 30))  # Seconds a turn waits for a free session
+STT_EOU_MODE = env_vars.get("STT_EOU_MODE", "silence")  # silence | words | final
+STT_MIN_WORDS = int(env_vars.get("STT_MIN_WORDS", 2))
+VOICE_HTML_PATH = os.path.join('Data', 'Voice.html')
 
 # HTML Template for Speech Recognition
 HTML_TEMPLATE = '''<!DOCTYPE html>
@@ -28,18 +41,54 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
         let recognition;
         let isRecognizing = false;
 
+        // Results are queued here and pushed to Python through waitForResults()
+        let pendingResults = [];
+        let resultWaiter = null;
+
+        function pushResult(transcript, isFinal) {
+            pendingResults.push({transcript: transcript, isFinal: isFinal, at: Date.now()});
+            if (resultWaiter) resultWaiter();
+        }
+
+        function waitForResults(waitMs, done) {
+            if (pendingResults.length) {
+                done(pendingResults.splice(0));
+                return;
+            }
+            const timer = setTimeout(function() {
+                resultWaiter = null;
+                done([]);
+            }, waitMs);
+            resultWaiter = function() {
+                clearTimeout(timer);
+                resultWaiter = null;
+                done(pendingResults.splice(0));
+            };
+        }
+
+        function resetTranscripts() {
+            pendingResults = [];
+            output.textContent = "";
+        }
+
         function startRecognition() {
             if (isRecognizing) return;
+            // Nothing from an earlier session may reach this one
+            resetTranscripts();
 
             recognition = new (window.SpeechRecognition || window.webkitSpeechRecognition)();
             recognition.lang = '{LANGUAGE}';
             recognition.continuous = true;
-            recognition.interimResults = false;
+            recognition.interimResults = true;
             isRecognizing = true;
 
             recognition.onresult = function(event) {
-                const transcript = event.results[event.results.length - 1][0].transcript;
-                output.textContent += transcript + ' ';
+                for (let i = event.resultIndex; i < event.results.length; i++) {
+                    const result = event.results[i];
+                    const transcript = result[0].transcript;
+                    if (result.isFinal) output.textContent += transcript + ' ';
+                    pushResult(transcript, result.isFinal);
+                }
             };
 
             recognition.onerror = function(event) {
@@ -60,6 +109,16 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
             recognition.stop();
             output.innerHTML = "";
         }
+
+        // Session hand-over: unlike stop(), abort() delivers no late final result
+        function abortRecognition() {
+            isRecognizing = false;
+            if (recognition) {
+                recognition.onresult = null;
+                recognition.abort();
+            }
+            resetTranscripts();
+        }
     </script>
 </body>
 </html>'''
@@ -68,73 +127,328 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
 def _setup_html():
     html_content = HTML_TEMPLATE.replace('{LANGUAGE}', InputLanguage)
     os.makedirs(os.path.join('Data'), exist_ok=True)
-    with open(os.path.join('Data', 'Voice.html'), 'w', encoding='utf-8') as f:
+    with open(VOICE_HTML_PATH, 'w', encoding='utf-8') as f:
         f.write(html_content)
 
-_setup_html()  # Ensure HTML file is ready
+@lru_cache(maxsize=1)
+def _voice_page_url():
+    _setup_html()
+    return f"file:///{os.path.abspath(VOICE_HTML_PATH)}"
 
 # Initialize WebDriver
-def _initialize_driver():
+@lru_cache(maxsize=1)
+def _chromedriver_path():
+    """Resolve chromedriver once per process instead of on every session"""
+    return ChromeDriverManager().install()
+
+
+@traced("stt.driver_start")
+def _initialize_driver(audio_file=None):
     chrome_options = Options()
     chrome_options.add_argument("--use-fake-ui-for-media-stream")
     chrome_options.add_argument("--use-fake-device-for-media-stream")
+    if audio_file:
+        # Feed a recorded WAV to the page's microphone instead of the host's
+        chrome_options.add_argument(f"--use-file-for-fake-audio-capture={os.path.abspath(audio_file)}%noloop")
     chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--window-size=1920,1080")
 
-    service = Service(ChromeDriverManager().install())
+    service = Service(_chromedriver_path())
     return webdriver.Chrome(service=service, options=chrome_options)
 
-# Text processing utilities
-def _query_modifier(query):
-    if not query:
-        return ""
-    query = query.lower().strip().rstrip('.?!')
-    is_question = any(query.startswith(word) for word in
-                     ["how", "what", "where", "who", "whom", "whose", "can you", "what is", "where is"])
-    return f"{query}{'?' if is_question else '.'}".capitalize()
 
+# Pool of warm browser sessions
+class _PooledDriver:
+    """A Chrome session with Voice.html loaded and a usage counter"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+class DriverPool:
+    """Keeps headless Chrome sessions alive between recognitions.
+
+    Sessions are checked out with `session()`, health-checked on checkout,
+    reset between users and recycled after `max_uses` turns or a crash.
+    """
+
+    def __init__(self, size=STT_POOL_SIZE, max_uses=STT_POOL_MAX_USES,
+                 driver_factory=_initialize_driver, page_url=None):
+        self.size = size
+        self.max_uses = max_uses
+        self.driver_factory = driver_factory
+        self.page_url = page_url
+        self._idle = deque()
+        self._created = 0
+        self._cond = threading.Condition()  # Guards _idle and _created; notified when either frees up
+        self._closed = False
+
+    def _page_url(self):
+        if self.page_url is None:
+            self.page_url = _voice_page_url()
+        return self.page_url
+
+    def _spawn(self):
+        driver = self.driver_factory()
+        try:
+            driver.get(self._page_url())
+        except Exception:
+            self._discard_driver(driver)
+            raise
+        return _PooledDriver(driver)
+
+    def _is_healthy(self, pooled):
+        try:
+            return pooled.driver.execute_script(
+                "return document.getElementById('output') !== null;"
+            ) is True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _discard_driver(driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Driver shutdown error: {e}")
+
+    def _discard(self, pooled):
+        self._uncount()
+        self._discard_driver(pooled.driver)
+
+    def _uncount(self):
+        # A slot freed up: a waiter may now start a new session
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    @traced("stt.pool_acquire")
+    def acquire(self, timeout=STT_POOL_TIMEOUT):
+        """Check out a healthy session, starting Chrome only if none is idle"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                while not self._idle and self._created >= self.size:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("No speech recognition session available")
+                    self._cond.wait(remaining)
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                pooled = self._idle.popleft() if self._idle else None
+                if pooled is None:
+                    self._created += 1
+
+            if pooled is None:
+                try:
+                    return self._spawn()
+                except Exception:
+                    self._uncount()
+                    raise
+
+            if self._is_healthy(pooled):
+                return pooled
+            print("Recycling unhealthy speech recognition session")
+            self._discard(pooled)
+
+    def release(self, pooled, broken=False):
+        """Return a session, resetting recognition state for the next user"""
+        pooled.uses += 1
+        if not broken:
+            try:
+                pooled.driver.execute_script("abortRecognition();")
+            except Exception:
+                broken = True
+
+        if broken or self._closed or pooled.uses >= self.max_uses:
+            self._discard(pooled)
+            return
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def session(self, timeout=STT_POOL_TIMEOUT):
+        pooled = self.acquire(timeout)
+        broken = False
+        try:
+            yield pooled.driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+
+
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Process-wide pool shared by get_recognized_text() and listen()"""
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool()
+            atexit.register(_driver_pool.close)
+        return _driver_pool
+
+# Text processing utilities
+@traced("stt.translate")
 def _universal_translator(text):
-    if not text or InputLanguage.lower().startswith('en'):
-        return text.capitalize() if text else ""
-    try:
-        return mt.translate(text, "en", "auto").capitalize()
-    except Exception as e:
-        print(f"Translation error: {e}")
-        return text.capitalize()
+    """Pass Arabic/English through untouched; translate anything else (cached, with a timeout)"""
+    return route(text).capitalize() if text else ""
 
-# Core recognition function
-def get_recognized_text(timeout=20):
-    driver = _initialize_driver()
-    try:
-        driver.get(f"file:///{os.path.abspath('Data/Voice.html')}")
-        driver.find_element(By.ID, "start").click()
+# End-of-utterance detection
+class EndOfUtterance:
+    """Decides when the collected transcript is a complete utterance.
+
+    Modes:
+        "silence": speech was heard and no result arrived for `silence_gap` seconds
+        "words":   at least `min_words` words were heard
+        "final":   the recogniser marked a result as final
+    """
+
+    MODES = ("silence", "words", "final")
 
-        last_text = ""
-        start_time = time.time()
+    def __init__(self, mode=STT_EOU_MODE, silence_gap=STT_SILENCE_GAP, min_words=STT_MIN_WORDS):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown end-of-utterance mode: {mode}")
+        self.mode = mode
+        self.silence_gap = silence_gap
+        self.min_words = min_words
+
+    def is_complete(self, text, got_final):
+        if self.mode == "words":
+            return len(text.split()) >= self.min_words
+        if self.mode == "final":
+            return got_final and bool(text)
+        return False  # "silence" is decided by the gap in collect_transcript()
+
+
+_WAIT_FOR_RESULTS_JS = "waitForResults(arguments[0], arguments[arguments.length - 1]);"
+
+
+@traced("stt.collect")
+def collect_transcript(page, timeout=20, policy=None):
+    """Block on transcripts pushed by the page until the utterance ends.
+
+    `page` is anything exposing Selenium's `execute_async_script`, so a fake
+    page emitting scripted results can stand in for Chrome.
+    """
+    policy = policy or EndOfUtterance()
+    deadline = time.monotonic() + timeout
+    final_parts = []
+    interim = ""
+    last_result_at = None
+
+    while True:
+        now = time.monotonic()
+        wait = deadline - now
+        if policy.mode == "silence" and last_result_at is not None:
+            wait = min(wait, last_result_at + policy.silence_gap - now)
+        if wait <= 0:
+            break
 
-        while time.time() - start_time < timeout:
-            current_text = driver.find_element(By.ID, "output").text.strip()
+        results = page.execute_async_script(_WAIT_FOR_RESULTS_JS, int(wait * 1000))
+        if not results:
+            continue
 
-            if current_text and len(current_text.split()) >= 2:
-                driver.find_element(By.ID, "end").click()
-                return _query_modifier(_universal_translator(current_text))
+        last_result_at = time.monotonic()
+        got_final = False
+        for result in results:
+            if result["isFinal"]:
+                final_parts.append(result["transcript"].strip())
+                interim = ""
+                got_final = True
+            else:
+                interim = result["transcript"].strip()
 
-            time.sleep(0.5)
+        text = " ".join(final_parts + [interim]).strip()
+        if policy.is_complete(text, got_final):
+            return text
 
+    return " ".join(final_parts + [interim]).strip()
+
+
+# Core recognition function
+@traced("stt.listen")
+def get_recognized_text(timeout=20, pool=None, policy=None):
+    pool = pool or get_driver_pool()
+    with pool.session() as driver:
+        driver.set_script_timeout(timeout + 5)
+        driver.find_element(By.ID, "start").click()
+
+        current_text = collect_transcript(driver, timeout, policy)
+        driver.find_element(By.ID, "end").click()
+
+        if current_text:
+            return query_modifier(_universal_translator(current_text))
         return ""
+
+# Recorded audio (e.g. uploaded from a browser client)
+@traced("stt.transcribe_file")
+def transcribe_file(audio_path, timeout=30, policy=None):
+    """Recognise speech in a WAV recording.
+
+    Chrome can only take a fake capture file at startup, so each recording
+    gets its own short-lived session outside the pool.
+    """
+    driver = _initialize_driver(audio_file=audio_path)
+    try:
+        driver.get(_voice_page_url())
+        driver.set_script_timeout(timeout + 5)
+        driver.find_element(By.ID, "start").click()
+        text = collect_transcript(driver, timeout, policy or EndOfUtterance("silence"))
+        return query_modifier(_universal_translator(text)) if text else ""
     finally:
         driver.quit()
 
 # Continuous listening (optional)
-def listen(callback, timeout=60):
+def listen(callback, timeout=60, pool=None):
     """
     Continuously listens for speech and calls `callback(text)` when detected.
     Args:
         callback (function): Function to call with recognized text.
         timeout (int): Timeout per listening session. Default: 60.
+        pool (DriverPool): Session pool to reuse between loops. Default: shared pool.
     """
+    pool = pool or get_driver_pool()
     while True:
-        text = get_recognized_text(timeout)
+        text = get_recognized_text(timeout, pool=pool)
         if text:
-            callback(text)
\ No newline at end of file
+            callback(text)
+
+
+# Pluggable engines (STTEngine and get_stt_engine() live in stt_engine.py)
+class SeleniumSTTEngine(STTEngine):
+    """Chrome's Web Speech API (remote recogniser) through the driver pool"""
+
+    name = "selenium"
+
+    def __init__(self, pool=None, policy=None):
+        self.pool = pool
+        self.policy = policy
+
+    def listen(self, timeout=20):
+        return get_recognized_text(timeout, pool=self.pool, policy=self.policy)
+
+    def transcribe_file(self, audio_path):
+        return transcribe_file(audio_path, policy=self.policy)
+
+    def warmup(self):
+        pool = self.pool or get_driver_pool()
+        pool.release(pool.acquire())
@@ -0,0 +1,57 @@
+"""Speech-to-text engine interface and selection, free of Selenium.
+
+stt.py (Chrome's Web Speech API) and local_stt.py (Whisper) implement
+STTEngine; STT_ENGINE picks one and only that module is imported, so the
+local engine runs without selenium or webdriver-manager installed.
+"""
+from dotenv import dotenv_values
+import components
+
+env_vars = dotenv_values(".env")
+STT_SILENCE_GAP = float(env_vars.get("STT_SILENCE_GAP", 1.2))  # Seconds of quiet ending an utterance
+STT_ENGINE = env_vars.get("STT_ENGINE", "selenium")  # selenium | local
+
+
+def query_modifier(query):
+    if not query:
+        return ""
+    query = query.lower().strip().rstrip('.?!')
+    is_question = any(query.startswith(word) for word in
+                     ["how", "what", "where", "who", "whom", "whose", "can you", "what is", "where is"])
+    return f"{query}{'?' if is_question else '.'}".capitalize()
+
+
+class STTEngine:
+    """Speech-to-text backend: live microphone turns and recorded files"""
+
+    name = "base"
+
+    def listen(self, timeout=20):
+        """Recognise one utterance from the microphone; "" if nothing was heard"""
+        raise NotImplementedError
+
+    def transcribe_file(self, audio_path):
+        """Recognise speech in a WAV recording"""
+        raise NotImplementedError
+
+    def warmup(self):
+        """Get ready for the first turn (load models, start sessions)"""
+
+    def close(self):
+        pass
+
+
+def _build_stt_engine():
+    if STT_ENGINE == "local":
+        from local_stt import LocalWhisperSTTEngine
+        return LocalWhisperSTTEngine()
+    from stt import SeleniumSTTEngine
+    return SeleniumSTTEngine()
+
+
+components.register("stt_engine", _build_stt_engine)
+
+
+def get_stt_engine():
+    """Engine selected by STT_ENGINE, shared process-wide"""
+    return components.get("stt_engine")
@@ -0,0 +1,94 @@
+import time
+
+from alert_outbox import AlertOutbox
+
+SMTP_CONFIG = {"sender": "alerts@example.org", "server": "smtp.example.org", "port": 587, "password": ""}
+
+
+class FakeSMTP:
+    """Refuses the first `failures` connections, then records every message"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.connections = 0
+        self.sent = []
+
+    def __call__(self, host, port, timeout):
+        self.connections += 1
+        if self.connections <= self.failures:
+            raise ConnectionRefusedError("server down")
+        return self
+
+    def noop(self):
+        return (250, b"OK")
+
+    def send_message(self, email):
+        self.sent.append(email)
+
+    def quit(self):
+        pass
+
+
+def _outbox(tmp_path, smtp, **kwargs):
+    return AlertOutbox(SMTP_CONFIG, "counsellor@example.org", db_path=str(tmp_path / "outbox.sqlite3"),
+                       smtp_factory=smtp, use_starttls=False, **kwargs)
+
+
+def _wait_for(outbox, ticket, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if outbox.status(ticket)["status"] == status:
+            return outbox.status(ticket)
+        time.sleep(0.01)
+    raise AssertionError(f"alert still {outbox.status(ticket)}")
+
+
+def test_enqueue_stores_alert_without_sending(tmp_path):
+    smtp = FakeSMTP()
+    outbox = _outbox(tmp_path, smtp)
+    ticket = outbox.enqueue("أبغى أموت", ["أبغى أموت"], session_id="s1")
+    assert outbox.status(ticket)["status"] == "pending"
+    assert smtp.connections == 0
+
+
+def test_failed_delivery_is_retried(tmp_path):
+    smtp = FakeSMTP(failures=2)
+    outbox = _outbox(tmp_path, smtp, backoff_seconds=0.01).start()
+    try:
+        ticket = outbox.enqueue("أبغى أموت", ["أبغى أموت"], session_id="s1")
+        status = _wait_for(outbox, ticket, "sent")
+    finally:
+        outbox.stop()
+    assert status["attempts"] == 3
+    assert len(smtp.sent) == 1
+    assert smtp.sent[0]["To"] == "counsellor@example.org"
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    smtp = FakeSMTP(failures=100)
+    outbox = _outbox(tmp_path, smtp, backoff_seconds=0.001, max_attempts=2).start()
+    try:
+        ticket = outbox.enqueue("kill myself", ["kill myself"])
+        status = _wait_for(outbox, ticket, "failed")
+    finally:
+        outbox.stop()
+    assert status["attempts"] == 2
+    assert "server down" in status["error"]
+
+
+def test_repeated_triggers_from_one_session_share_a_ticket(tmp_path):
+    outbox = _outbox(tmp_path, FakeSMTP(), dedupe_window=600)
+    first = outbox.enqueue("أبغى أموت", ["أبغى أموت"], session_id="s1")
+    assert outbox.enqueue("انتحار", ["انتحار"], session_id="s1") == first
+    assert outbox.enqueue("انتحار", ["انتحار"], session_id="s2") != first
+
+
+def test_pending_alerts_survive_a_restart(tmp_path):
+    ticket = _outbox(tmp_path, FakeSMTP()).enqueue("أبغى أموت", ["أبغى أموت"], session_id="s1")
+    smtp = FakeSMTP()
+    outbox = _outbox(tmp_path, smtp).start()
+    try:
+        _wait_for(outbox, ticket, "sent")
+    finally:
+        outbox.stop()
+    assert len(smtp.sent) == 1
@@ -0,0 +1,27 @@
+import pytest
+
+from crisis_detection import match_crisis_phrases
+
+
+@pytest.mark.parametrize("text", [
+    "أبغى أموت",
+    "ابغى اموت",  # Hamza dropped, as speech-to-text often writes it
+    "أَبْغَى أَمُوتْ",  # Diacritics
+    "والله تعبت وأفكر في الانتحار",
+    "أتمنى الموت",
+    "I want to DIE",
+])
+def test_crisis_phrases_match_after_normalisation(text):
+    assert match_crisis_phrases(text)
+
+
+@pytest.mark.parametrize("text", [
+    "أموت من الضحك",
+    "أموت فيك",
+    "تعبت من الحياة في الغربة بس الحمد لله",
+    "ما أقدر أنام بالليل",
+    "",
+    "   ",
+])
+def test_everyday_speech_does_not_match(text):
+    assert match_crisis_phrases(text) == []
@@ -0,0 +1,54 @@
+import pytest
+
+from dialect import DialectRewriter, get_dialect_rewriter
+
+MAPPING = {
+    "كثير": "وايد",
+    "ماذا": "شو",
+    "لا يوجد": "ما في",
+    "في هذا الوقت": "الحين",
+    "نعم": "إي",
+}
+TEXTS = [
+    "لا يوجد شي كثير في هذا الوقت، ماذا تبغى؟",
+    "وكثير من الناس فلا يوجد عندهم وقت",  # Proclitic before a single and a multi-word source
+    "نعمة كثيرة، نعم.",  # Sources inside longer words stay as they are
+    "لا\nيوجد في  هذا الوقت",
+    "بكثير",
+]
+
+
+def pieces(text, *cuts):
+    bounds = [0, *cuts, len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_stream_matches_rewrite_at_every_split(text):
+    rewriter = DialectRewriter(MAPPING)
+    expected = rewriter.rewrite(text)
+    for cut in range(len(text) + 1):
+        assert "".join(rewriter.stream(pieces(text, cut))) == expected, cut
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_stream_matches_rewrite_one_character_at_a_time(text):
+    rewriter = DialectRewriter(MAPPING)
+    assert "".join(rewriter.stream(text)) == rewriter.rewrite(text)
+
+
+def test_splits_inside_sources_and_after_a_proclitic():
+    rewriter = DialectRewriter(MAPPING)
+    text = "وكثير فلا يوجد شي في هذا الوقت"
+    assert rewriter.rewrite(text) == "ووايد فما في شي الحين"
+    for cut in (1, 7, 3, 12, 22, 10, 21, 25):  # After و/ف, inside كثير/يوجد/هذا, between source words
+        assert "".join(rewriter.stream(pieces(text, cut))) == rewriter.rewrite(text), cut
+
+
+def test_stream_matches_rewrite_with_the_shipped_lexicon():
+    rewriter = get_dialect_rewriter()
+    text = "نعم، حاول تحل المشكلة بالقلب وشكراً على الكثير."
+    expected = rewriter.rewrite(text)
+    assert expected != text
+    for cut in range(len(text) + 1):
+        assert "".join(rewriter.stream(pieces(text, cut))) == expected, cut
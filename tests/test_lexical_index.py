@@ -0,0 +1,94 @@
+import math
+import os
+
+import pytest
+
+from lexical_index import (BM25_B, BM25_K1, CURRENT_FILE, build_lexical_index, current_version, index_path,
+                           open_lexical_index, tokenize)
+
+CHUNKS = [
+    ("a", "القلق يزيد في الليل والقلق يتعب القلب", {"page": 1}),
+    ("b", "تمارين التنفس تخفف القلق", {"page": 2}),
+    ("c", "النوم المبكر مفيد للصحة", {"page": 3}),
+]
+
+
+def bm25(query, chunks):
+    """Textbook BM25 over `chunks`, for comparison with the index"""
+    docs = {chunk_id: tokenize(text) for chunk_id, text, _ in chunks}
+    avg = sum(len(terms) for terms in docs.values()) / len(docs)
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(term in terms for terms in docs.values())
+        if not df:
+            continue
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for chunk_id, terms in docs.items():
+            tf = terms.count(term)
+            if tf:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * len(terms) / avg)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return scores
+
+
+@pytest.fixture
+def index(tmp_path):
+    build_lexical_index(CHUNKS, str(tmp_path), kb_version=1)
+    index = open_lexical_index(str(tmp_path))
+    yield index
+    index.close()
+
+
+def test_scores_are_bm25(index):
+    query = "كيف أخفف القلق بالتنفس"
+    results = index.search(query, k=3)
+    expected = bm25(query, CHUNKS)
+
+    assert [chunk_id for chunk_id, _ in results] == sorted(expected, key=expected.get, reverse=True)
+    for chunk_id, score in results:
+        assert score == pytest.approx(expected[chunk_id])
+
+
+def test_stemmed_forms_share_postings(index):
+    assert [chunk_id for chunk_id, _ in index.search("بالقلق", k=3)] == ["a", "b"]
+    assert index.search("السفر") == []
+
+
+def test_get_returns_text_and_metadata(index):
+    assert index.get(["c", "missing"]) == {"c": (CHUNKS[2][1], {"page": 3})}
+
+
+def test_build_switches_current_and_removes_old_versions(tmp_path):
+    path = index_path(str(tmp_path))
+    assert open_lexical_index(str(tmp_path)) is None
+
+    build_lexical_index(CHUNKS, str(tmp_path), kb_version=1)
+    first = current_version(path)
+    build_lexical_index(CHUNKS[:1], str(tmp_path), kb_version=2)
+    second = current_version(path)
+
+    assert first != second and second.startswith("2-")
+    assert sorted(os.listdir(path)) == sorted([CURRENT_FILE, second])
+
+
+def test_refresh_picks_up_a_rebuild(tmp_path, index):
+    assert index.refresh() is False
+
+    build_lexical_index([("d", "القلق قبل الامتحان", {})], str(tmp_path), kb_version=2)
+
+    assert index.refresh() is True
+    assert index.kb_version == 2
+    assert len(index) == 1
+    assert [chunk_id for chunk_id, _ in index.search("القلق")] == ["d"]
+    assert index.refresh() is False
+
+
+def test_refresh_keeps_a_version_open_until_its_search_ends(tmp_path, index):
+    old = index._acquire()  # A search in progress on the first version
+    build_lexical_index(CHUNKS[:1], str(tmp_path), kb_version=2)
+    assert index.refresh() is True
+
+    assert not old.files[0].closed
+    assert bytes(old.chunks[old.offsets[2]:old.offsets[3]])  # Still readable
+    index._release(old)
+    assert old.files[0].closed and old.maps[0].closed
@@ -0,0 +1,69 @@
+import random
+
+from dialect import DialectRewriter
+from postprocess import Insert, PostProcessor
+
+CLASSIFIERS = {"anxiety": ["قلق"], "family": ["أسرة"]}
+REWRITER = DialectRewriter({"كثير": "وايد", "حاول": "جرب"})
+FILLERS = ["حاول يا ابن الحلال", "الله يساعدك", "تفضل"]
+
+
+def build(inserts, seed=None):
+    return PostProcessor(CLASSIFIERS, inserts, strip=["•"], rewriter=REWRITER, seed=seed)
+
+
+def old_chain(text, labels, filler="حاول يا ابن الحلال"):
+    """The chain the rules replaced: each stage wraps the output of the one before"""
+    # format_response
+    text = text.replace("•", "")
+    if "anxiety" in labels:
+        text = f"{filler} {text}"
+    text = f"{text} شوف"
+    # apply_cultural_adjustment: the dialect rewrite also reaches the format fillers
+    text = REWRITER.rewrite(text)
+    text = f"الله يعينك {text} والله أعلم"
+    # enhance_therapeutic_quality
+    if "family" in labels:
+        text = f"{text}\n\nشو رأيك؟"
+    return f"(بعد لحظة)\n\n{text}"
+
+
+def inserts(fillers=("حاول يا ابن الحلال",)):
+    # Listed out of stage order on purpose: the processor must sort them
+    return [
+        Insert("therapeutic", "prefix", "(بعد لحظة)", joiner="\n\n"),
+        Insert("cultural", "suffix", "والله أعلم"),
+        Insert("therapeutic", "suffix", "\n\nشو رأيك؟", when={"family"}, joiner=""),
+        Insert("format", "prefix", list(fillers), when={"anxiety"}, dialect=True),
+        Insert("cultural", "prefix", "الله يعينك"),
+        Insert("format", "suffix", "شوف", dialect=True),
+    ]
+
+
+def test_stage_order_matches_the_old_chain():
+    processor = build(inserts())
+    reply = "• عندك كثير أشياء"
+    for query, labels in [("وش أسوي", set()), ("عندي قلق", {"anxiety"}),
+                          ("مشكلة في الأسرة مع قلق", {"anxiety", "family"})]:
+        assert processor.process(reply, query) == old_chain(reply, labels), query
+
+
+def test_seeded_picks_are_reproducible_and_in_chain_order():
+    reply = "عندك كثير أشياء"
+    first = build(inserts(FILLERS), seed=7)
+    second = build(inserts(FILLERS), seed=7)
+    outputs = [first.process(reply, "عندي قلق") for _ in range(20)]
+
+    assert outputs == [second.process(reply, "عندي قلق") for _ in range(20)]
+    assert set(outputs) <= {old_chain(reply, {"anxiety"}, filler) for filler in FILLERS}
+    assert len(set(outputs)) > 1  # The bank is actually sampled
+
+    rng = random.Random(3)
+    assert first.process(reply, "عندي قلق", rng=rng) == second.process(reply, "عندي قلق", rng=random.Random(3))
+
+
+def test_partial_stages_leave_later_inserts_out():
+    processor = build(inserts())
+    assert processor.process("•كثير", "عندي قلق", stages=("format",)) == "حاول يا ابن الحلال كثير شوف"
+    assert processor.process("•كثير", "عندي قلق", stages=("format", "cultural")) == \
+        "الله يعينك جرب يا ابن الحلال وايد شوف والله أعلم"
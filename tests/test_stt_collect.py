@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+from stt import EndOfUtterance, collect_transcript  # noqa: E402
+
+
+class FakePage:
+    """Stands in for Chrome: each waitForResults call returns the next scripted batch"""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.calls = 0
+
+    def execute_async_script(self, script, wait_ms):
+        self.calls += 1
+        return self.batches.pop(0) if self.batches else []
+
+
+def result(transcript, final=False):
+    return {"transcript": transcript, "isFinal": final}
+
+
+def test_final_mode_returns_at_the_first_final_result():
+    page = FakePage([[result("ما أقدر")], [result("ما أقدر أنام", final=True)], [result("بعدين")]])
+    text = collect_transcript(page, timeout=5, policy=EndOfUtterance(mode="final"))
+    assert text == "ما أقدر أنام"
+    assert page.calls == 2
+
+
+def test_words_mode_stops_once_enough_words_arrive():
+    page = FakePage([[result("أنا")], [result("أنا قلقان وايد")]])
+    text = collect_transcript(page, timeout=5, policy=EndOfUtterance(mode="words", min_words=3))
+    assert text == "أنا قلقان وايد"
+
+
+def test_silence_mode_joins_final_parts_after_the_gap():
+    page = FakePage([[result("أنا قلقان", final=True)], [result("من الامتحانات", final=True)]])
+    text = collect_transcript(page, timeout=5, policy=EndOfUtterance(mode="silence", silence_gap=0.05))
+    assert text == "أنا قلقان من الامتحانات"
+
+
+def test_nothing_heard_returns_empty_text():
+    text = collect_transcript(FakePage([]), timeout=0.05, policy=EndOfUtterance(mode="silence"))
+    assert text == ""
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        EndOfUtterance(mode="magic")
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+from stt import DriverPool  # noqa: E402
+
+
+class FakeDriver:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.quit_called = False
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script):
+        return self.healthy
+
+    def quit(self):
+        self.quit_called = True
+
+
+def _pool(size=1, max_uses=50):
+    return DriverPool(size=size, max_uses=max_uses, driver_factory=FakeDriver, page_url="about:blank")
+
+
+def test_idle_session_is_reused():
+    pool = _pool()
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+
+
+def test_waiter_spawns_once_a_recycled_session_frees_its_slot():
+    pool = _pool(size=1, max_uses=1)
+    first = pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(timeout=None)), daemon=True)
+    waiter.start()
+    time.sleep(0.1)
+    assert not acquired
+
+    pool.release(first)  # Used up: discarded instead of returned to the pool
+    waiter.join(2)
+
+    assert acquired and acquired[0] is not first
+    assert first.driver.quit_called
+
+
+def test_full_pool_times_out():
+    pool = _pool(size=1)
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+
+
+def test_close_wakes_waiters():
+    pool = _pool(size=1)
+    pool.acquire()
+    errors = []
+
+    def wait():
+        try:
+            pool.acquire(timeout=None)
+        except RuntimeError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait, daemon=True)
+    waiter.start()
+    time.sleep(0.05)
+    pool.close()
+    waiter.join(2)
+    assert errors
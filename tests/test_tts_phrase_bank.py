@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pygame")
+pytest.importorskip("edge_tts")
+import tts  # noqa: E402
+from benchmarks.stubs import FakeCommunicate  # noqa: E402
+
+CRISIS = "أنا وياك، وسلامتك أهم شي الحين. الله يحفظك: كلم الخط الساخن أو روح لأقرب طوارئ."
+BREATHING = "خد/خدي نفس عميق (شهيق 4 ثواني، زفير 6 ثواني)... كررها 3 مرات"
+
+
+class RecordingCommunicate(FakeCommunicate):
+    """FakeCommunicate that remembers what it was asked to say"""
+
+    latency = 0
+    texts = []
+
+    def __init__(self, text, voice=None, **kwargs):
+        super().__init__(text, voice, **kwargs)
+        self.texts.append(text)
+
+
+def fake_audio(text):
+    """The bytes FakeCommunicate produces for `text`"""
+    async def collect():
+        return b"".join([chunk["data"] async for chunk in FakeCommunicate(text).stream()])
+    return asyncio.run(collect())
+
+
+def cached(text):
+    return tts.audio_cache._entries.get(tts.AudioCache.key(text, tts.AssistantVoice, tts.VOICE_SETTINGS))
+
+
+@pytest.fixture
+def synthesized(monkeypatch):
+    """Texts sent to edge-tts; the bank and cache are fresh for each test"""
+    monkeypatch.setattr(tts.edge_tts, "Communicate", RecordingCommunicate)
+    monkeypatch.setattr(RecordingCommunicate, "texts", [])
+    monkeypatch.setattr(tts, "audio_cache", tts.AudioCache())
+    monkeypatch.setattr(tts, "BANGLA_RESPONSES", [])
+    monkeypatch.setattr(tts, "_phrase_bank", [])
+    monkeypatch.setattr(tts, "_phrase_pattern", None)
+    return RecordingCommunicate.texts
+
+
+def test_prerender_pins_the_bank_audio(synthesized):
+    assert tts.prerender([BREATHING, CRISIS]) == 2
+
+    assert sorted(synthesized) == sorted([BREATHING, CRISIS])
+    for phrase in (BREATHING, CRISIS):
+        assert cached(phrase) == fake_audio(phrase)
+    assert tts.audio_cache._pinned == {
+        tts.AudioCache.key(phrase, tts.AssistantVoice, tts.VOICE_SETTINGS) for phrase in (BREATHING, CRISIS)
+    }
+
+
+def test_pinned_phrases_survive_eviction(synthesized):
+    tts.audio_cache.max_bytes = 1
+    tts.prerender([BREATHING])
+
+    asyncio.run(tts.synthesize_response("الله يعينك"))
+
+    assert cached(BREATHING) == fake_audio(BREATHING)
+    assert cached("الله يعينك") is None  # Over the byte budget and not pinned
+
+
+def test_bank_phrase_is_served_from_cache(synthesized):
+    tts.prerender([BREATHING])
+    synthesized.clear()
+
+    audio = asyncio.run(tts.synthesize_response("جرب تمشي شوي. " + BREATHING))
+
+    assert synthesized == ["جرب تمشي شوي."]  # Only the free text is synthesised
+    assert audio == fake_audio("جرب تمشي شوي.") + cached(BREATHING)
+
+
+def test_text_outside_the_bank_is_synthesised_and_cached(synthesized):
+    tts.prerender([BREATHING])
+    synthesized.clear()
+
+    audio = asyncio.run(tts.synthesize_response("الله يعينك"))
+
+    assert synthesized == ["الله يعينك"]
+    assert cached("الله يعينك") == audio == fake_audio("الله يعينك")
+    assert len(tts.audio_cache._pinned) == 1
+
+
+def test_split_segments_without_bank_keeps_text_whole(synthesized):
+    assert tts.split_segments("نص عادي. بدون عبارات") == ["نص عادي. بدون عبارات"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1000])
+def test_segmenter_never_cuts_inside_a_bank_phrase(chunk_size):
+    text = "حاسس بضيق اليوم وما أعرف شو أسوي. " + BREATHING + " وبعدين كلمني. " + CRISIS
+    segmenter = tts.SentenceSegmenter(phrases=[CRISIS, BREATHING])
+    sentences = []
+    for i in range(0, len(text), chunk_size):
+        sentences += segmenter.feed(text[i:i + chunk_size])
+    sentences += segmenter.flush()
+
+    assert any(BREATHING in sentence for sentence in sentences)
+    assert CRISIS in sentences
+    assert "حاسس بضيق اليوم وما أعرف شو أسوي." in sentences
+
+
+def test_streamed_crisis_reply_hits_its_cached_audio(synthesized):
+    tts.prerender([CRISIS])
+    synthesized.clear()
+
+    segmenter = tts.SentenceSegmenter()
+    sentences = segmenter.feed(CRISIS) + segmenter.flush()
+    audio = b"".join(asyncio.run(tts.synthesize_response(sentence)) for sentence in sentences)
+
+    assert sentences == [CRISIS]
+    assert synthesized == []
+    assert audio == cached(CRISIS)
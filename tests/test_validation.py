@@ -0,0 +1,77 @@
+import pytest
+
+from validation import EscalatingValidator, RuleValidator
+
+QUERY = "أحس بضيق وما أقدر أنام"
+# Two dialect markers, a suggestion, no lecture structure: 0.4 + 0.3 + 0.3
+OMANI = "الحين خذ نفس عميق وامش شوي قبل النوم، وخلي الجوال بعيد عنك الليلة وبتحس براحة إن شاء الله"
+# One dialect marker and a suggestion: 0.2 + 0.3 + 0.3
+ONE_MARKER = "الحين خذ نفس عميق وامش قليلاً قبل النوم، وضع الهاتف بعيداً عنك الليلة وستشعر براحة بإذن الله"
+# Plain MSA lecture without advice: 0.0 + 0.0 + 0.0
+LECTURE = "أولاً يجب أن نفهم أن الأرق اضطراب شائع، ثانياً تتعدد أسبابه بين النفسية والجسدية، وفي الختام هو حالة تستحق الاهتمام"
+
+
+class CountingRemote:
+    name = "gemini"
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    def validate(self, query, response, draft=None):
+        self.calls += 1
+        return self.answer
+
+
+@pytest.fixture
+def rules():
+    return RuleValidator()
+
+
+def test_scores_of_each_criterion(rules):
+    assert rules.score(QUERY, OMANI) == pytest.approx(1.0)
+    assert rules.score(QUERY, ONE_MARKER) == pytest.approx(0.8)
+    assert rules.score(QUERY, LECTURE) == pytest.approx(0.0)
+
+
+def test_lists_and_length_fail_outright(rules):
+    assert rules.score(QUERY, "- الحين جرب\n- شوي " + OMANI) == 0.0
+    assert rules.score(QUERY, "الحين جرب شوي") == 0.0  # Under VALIDATOR_MIN_WORDS
+
+
+def test_draft_is_scored_instead_of_the_reply(rules):
+    # The rewrite and inserts can make an MSA lecture look Omani; the draft decides
+    assert rules.score(QUERY, OMANI, draft=LECTURE) == 0.0
+
+
+def test_accept_threshold_is_inclusive():
+    assert RuleValidator(accept=0.8).validate(QUERY, ONE_MARKER)
+    assert not RuleValidator(accept=0.81).validate(QUERY, ONE_MARKER)
+
+
+@pytest.mark.parametrize("accept, reject, expected", [
+    (0.75, 0.35, True),    # 0.8 clears the accept threshold
+    (0.9, 0.35, None),     # Between the thresholds: Gemini decides
+    (0.9, 0.8, False),     # At the reject threshold counts as a rejection
+])
+def test_escalating_thresholds(rules, accept, reject, expected):
+    remote = CountingRemote(answer=True)
+    validator = EscalatingValidator(rules, remote, accept=accept, reject=reject)
+
+    assert validator.decide_locally(QUERY, ONE_MARKER) is expected
+    assert validator.validate(QUERY, ONE_MARKER) is (True if expected is None else expected)
+    assert remote.calls == (1 if expected is None else 0)
+
+
+def test_clear_cases_never_reach_gemini(rules):
+    remote = CountingRemote(answer=False)
+    validator = EscalatingValidator(rules, remote)
+
+    assert validator.validate(QUERY, OMANI)
+    assert not validator.validate(QUERY, LECTURE)
+    assert remote.calls == 0
+
+
+@pytest.mark.parametrize("word", ["ترى", "خل", "تبا", "أبا"])
+def test_words_shared_with_msa_are_not_dialect_markers(rules, word):
+    assert rules.score(QUERY, f"{word} {ONE_MARKER}") == pytest.approx(0.8)
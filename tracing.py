@@ -0,0 +1,222 @@
+"""Per-stage timing across a voice turn.
+
+    with tracing.turn(turn_id):          # turn id in a context var
+        with tracing.span("stt.listen"):
+            ...
+
+Every span feeds the `span.<name>.seconds` histogram and the per-turn
+breakdown kept for the last few turns. With OTEL_EXPORTER_OTLP_ENDPOINT set
+(and opentelemetry-sdk + the OTLP exporter installed) spans are exported
+as well. TRACING=1 turns it on; when off, `span()` hands back one shared
+no-op context manager.
+
+METRICS_PORT serves every histogram at /metrics (Prometheus text format)
+and the recent turn breakdowns at /turns (JSON).
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from metrics import get_histogram, snapshot
+
+TRACING = os.getenv("TRACING", "0") == "1"
+TRACE_TURNS_KEPT = int(os.getenv("TRACE_TURNS_KEPT", 50))
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+_turn_id: ContextVar[Optional[str]] = ContextVar("turn_id", default=None)
+_NOOP = nullcontext()
+_turns: "OrderedDict[str, List[Dict]]" = OrderedDict()
+_turns_lock = threading.Lock()
+_otel = None  # Tracer, False if unavailable, None until first use
+
+
+def enable(on: bool = True) -> None:
+    global TRACING
+    TRACING = on
+
+
+def current_turn_id() -> Optional[str]:
+    return _turn_id.get()
+
+
+def new_turn_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def turn(turn_id: Optional[str] = None):
+    """Run the block as part of turn `turn_id` (a new one if None); spans inside carry its id.
+
+    Worker threads do not inherit it: start them through contextvars.copy_context().run.
+    """
+    token = _turn_id.set(turn_id or new_turn_id())
+    try:
+        yield _turn_id.get()
+    finally:
+        _turn_id.reset(token)
+
+
+def iterate(iterable, turn_id: str):
+    """Drive a generator step by step inside turn `turn_id`.
+
+    Gradio may resume a streaming handler on another thread, so the turn id
+    is set around every step rather than once.
+    """
+    iterator = iter(iterable)
+    while True:
+        with turn(turn_id):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def _otel_tracer():
+    global _otel
+    if _otel is None:
+        _otel = False
+        if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+            try:
+                from opentelemetry import trace
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                from opentelemetry.sdk.trace import TracerProvider
+                from opentelemetry.sdk.trace.export import BatchSpanProcessor
+                provider = TracerProvider()
+                provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                trace.set_tracer_provider(provider)
+                _otel = trace.get_tracer("omani-therapist")
+            except ImportError:
+                print("OpenTelemetry not installed - spans stay in-process")
+    return _otel
+
+
+class _Span:
+    __slots__ = ("name", "attributes", "started", "_otel_span")
+
+    def __init__(self, name: str, attributes: Dict):
+        self.name = name
+        self.attributes = attributes
+        self._otel_span = None
+
+    def __enter__(self):
+        tracer = _otel_tracer()
+        if tracer:
+            attributes = dict(self.attributes, turn_id=_turn_id.get() or "")
+            self._otel_span = tracer.start_as_current_span(self.name, attributes=attributes)
+            self._otel_span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started, started=self.started)
+        if self._otel_span is not None:
+            self._otel_span.__exit__(*exc)
+        return False
+
+
+def span(name: str, **attributes):
+    """Time the block as stage `name` of the current turn"""
+    if not TRACING:
+        return _NOOP
+    return _Span(name, attributes)
+
+
+def traced(name: str):
+    """Decorator form of span() for whole functions"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRACING:
+                return fn(*args, **kwargs)
+            with _Span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record(name: str, seconds: float, started: Optional[float] = None) -> None:
+    """Record a duration measured elsewhere (callbacks, generators) as a span"""
+    if not TRACING:
+        return
+    get_histogram(f"span.{name}.seconds").observe(seconds)
+    turn_id = _turn_id.get()
+    if turn_id is None:
+        return
+    if started is None:
+        started = time.perf_counter() - seconds
+    with _turns_lock:
+        spans = _turns.get(turn_id)
+        if spans is None:
+            spans = _turns[turn_id] = []
+            while len(_turns) > TRACE_TURNS_KEPT:
+                _turns.popitem(last=False)
+        spans.append({"name": name, "started": started, "seconds": seconds})
+
+
+def turn_breakdown(turn_id: str) -> List[Dict]:
+    """Spans of one turn in start order, with offsets from the first span"""
+    with _turns_lock:
+        spans = sorted(_turns.get(turn_id, []), key=lambda s: s["started"])
+    if not spans:
+        return []
+    origin = spans[0]["started"]
+    return [{"name": s["name"], "offset": s["started"] - origin, "seconds": s["seconds"]} for s in spans]
+
+
+def recent_turns() -> Dict[str, List[Dict]]:
+    with _turns_lock:
+        turn_ids = list(_turns)
+    return {turn_id: turn_breakdown(turn_id) for turn_id in turn_ids}
+
+
+# /metrics endpoint
+_METRIC_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def render_prometheus() -> str:
+    """Every histogram as a Prometheus summary"""
+    lines = []
+    for name, summary in sorted(snapshot().items()):
+        metric = _METRIC_NAME.sub("_", name)
+        lines.append(f"# TYPE {metric} summary")
+        for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            lines.append(f'{metric}{{quantile="{quantile}"}} {summary[key]}')
+        lines.append(f"{metric}_sum {summary['mean'] * summary['count']}")
+        lines.append(f"{metric}_count {summary['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = render_prometheus().encode(), "text/plain; version=0.0.4"
+        elif self.path == "/turns":
+            body, content_type = json.dumps(recent_turns()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Metrics at http://localhost:{port}/metrics")
+    return server
@@ -0,0 +1,161 @@
+"""Language routing and cached translation for recognised speech.
+
+The chat engine is prompted in Arabic and also copes with English, so most
+utterances need no translation at all: the script of the text is checked
+locally and only text in other languages goes through `mtranslate`, behind a
+persistent cache and a per-call timeout.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Optional
+
+import mtranslate as mt
+
+from metrics import get_histogram
+from tracing import span
+
+TRANSLATION_CACHE_PATH = os.getenv('TRANSLATION_CACHE_PATH', os.path.join('Data', 'translation_cache.sqlite3'))
+TRANSLATION_CACHE_ENTRIES = int(os.getenv('TRANSLATION_CACHE_ENTRIES', 20000))
+TRANSLATION_TIMEOUT = float(os.getenv('TRANSLATION_TIMEOUT', 2.0))  # Seconds before the original text is used
+TRANSLATION_TARGET = os.getenv('TRANSLATION_TARGET', 'ar')
+# Languages the chat engine answers in directly
+PASSTHROUGH_LANGUAGES = set(os.getenv('PASSTHROUGH_LANGUAGES', 'ar,en').split(','))
+SCRIPT_RATIO = 0.6  # Share of letters in one script needed to call the language
+
+_SCRIPTS = (
+    ('ar', ((0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF))),
+    ('en', ((0x0041, 0x005A), (0x0061, 0x007A), (0x00C0, 0x024F))),
+)
+
+
+def script_profile(text: str) -> Dict[str, float]:
+    """Share of letters belonging to each known script ('other' for the rest)"""
+    counts = {name: 0 for name, _ in _SCRIPTS}
+    counts['other'] = 0
+    letters = 0
+    for char in text:
+        if not char.isalpha():
+            continue
+        letters += 1
+        code = ord(char)
+        for name, ranges in _SCRIPTS:
+            if any(low <= code <= high for low, high in ranges):
+                counts[name] += 1
+                break
+        else:
+            counts['other'] += 1
+    return {name: count / letters for name, count in counts.items()} if letters else {}
+
+
+def detect_language(text: str) -> Optional[str]:
+    """'ar' or 'en' when one script clearly dominates, 'other' for anything else, None for no letters.
+
+    Latin script is taken as English, which is what the engine needs to know:
+    both are answered without translation.
+    """
+    profile = script_profile(text)
+    if not profile:
+        return None
+    name, share = max(profile.items(), key=lambda item: item[1])
+    return name if share >= SCRIPT_RATIO else 'other'
+
+
+class TranslationCache:
+    """Bounded SQLite cache of translations, least recently used evicted first"""
+
+    def __init__(self, path: str = TRANSLATION_CACHE_PATH, max_entries: int = TRANSLATION_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations (source TEXT NOT NULL, target TEXT NOT NULL, "
+            "translated TEXT NOT NULL, used REAL NOT NULL, PRIMARY KEY (source, target))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS translations_used ON translations (used)")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source: str, target: str) -> Optional[str]:
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT translated FROM translations WHERE source = ? AND target = ?", (source, target)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute(
+                "UPDATE translations SET used = ? WHERE source = ? AND target = ?", (time.time(), source, target)
+            )
+            return row[0]
+
+    def put(self, source: str, target: str, translated: str) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations (source, target, translated, used) VALUES (?, ?, ?, ?)",
+                (source, target, translated, time.time())
+            )
+            (count,) = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM translations WHERE rowid IN "
+                    "(SELECT rowid FROM translations ORDER BY used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+# Few workers on purpose: a hung request occupies one, callers stop waiting after the timeout
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="translate")
+
+
+def get_translation_cache() -> TranslationCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache()
+        return _cache
+
+
+def translate(text: str, target: str = TRANSLATION_TARGET, timeout: float = TRANSLATION_TIMEOUT,
+              cache: TranslationCache = None) -> str:
+    """Cached `mtranslate` call; returns `text` unchanged on error or timeout"""
+    source = " ".join(text.split())
+    cache = cache or get_translation_cache()
+    cached = cache.get(source, target)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    future = _executor.submit(mt.translate, source, target, "auto")
+    try:
+        with span("translate.request"):
+            translated = future.result(timeout=timeout)
+    except FutureTimeout:
+        print(f"Translation timed out after {timeout}s, using original text")
+        return text
+    except Exception as e:
+        print(f"Translation error: {e}")
+        return text
+    finally:
+        get_histogram("translate.seconds").observe(time.perf_counter() - started)
+
+    cache.put(source, target, translated)
+    return translated
+
+
+def route(text: str, target: str = TRANSLATION_TARGET) -> str:
+    """Text the chat engine can use: as-is when it already handles the language, translated otherwise"""
+    if not text:
+        return ""
+    language = detect_language(text)
+    if language is None or language in PASSTHROUGH_LANGUAGES:
+        get_histogram("translate.skipped").observe(1)
+        return text
+    return translate(text, target)
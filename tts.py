@@ -1,14 +1,26 @@
 import pygame
 import random
 import asyncio
+import atexit
+import contextvars
 import edge_tts
-import os
+import hashlib
+import io
+import queue
+import re
+import threading
+import time
 from dotenv import dotenv_values
-from typing import Callable, Optional
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, Optional
+from metrics import get_histogram
+from tracing import record, span
 
 # Load environment variables
 env_vars = dotenv_values(".env")
 AssistantVoice = env_vars.get("ASSISTANT_VOICE", "bn-BD-NabanitaNeural")  # Default to Bangla voice
+TTS_CACHE_BYTES = int(env_vars.get("TTS_CACHE_BYTES", 64 * 1024 * 1024))
+PLAYER_CHANNELS = int(env_vars.get("PLAYER_CHANNELS", 16))  # Concurrent sessions playing at once
 
 # Bangla responses for long messages
 BANGLA_RESPONSES = [
@@ -20,52 +32,252 @@ BANGLA_RESPONSES = [
 ]
 
 
-async def TextToAudioFile(text: str) -> None:
-    """Convert text to speech audio file"""
-    file_path = r"Data\speech.mp3"
+VOICE_SETTINGS = {
+    "pitch": "+5Hz",
+    "rate": "+10%",  # Slightly slower for Bangla
+    "volume": "+0%"
+}
 
-    if os.path.exists(file_path):
-        os.remove(file_path)
 
-    # Adjust voice parameters for Bangla
-    communicate = edge_tts.Communicate(
-        text,
-        voice=AssistantVoice,
-        pitch="+5Hz",
-        rate="+10%",  # Slightly slower for Bangla
-        volume="+0%"
-    )
-    await communicate.save(file_path)
+# Audio cache
+class AudioCache:
+    """Content-addressed MP3 cache keyed by (text, voice, pitch, rate, volume).
 
+    Bounded by total bytes with LRU eviction; pinned entries (the pre-rendered
+    phrase bank) are never evicted.
+    """
 
-def TTS(text: str, callback: Optional[Callable] = lambda r=None: True) -> bool:
-    """Play text as speech with error handling"""
-    while True:
-        try:
-            asyncio.run(TextToAudioFile(text))
+    def __init__(self, max_bytes: int = TTS_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._pinned = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, voice: str, settings: Dict[str, str]) -> str:
+        parts = [text, voice, settings["pitch"], settings["rate"], settings["volume"]]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return audio
+
+    def put(self, key: str, audio: bytes, pin: bool = False) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = audio
+            self._bytes += len(audio)
+            if pin:
+                self._pinned.add(key)
+            for old_key in list(self._entries):
+                if self._bytes <= self.max_bytes:
+                    break
+                if old_key not in self._pinned:
+                    self._bytes -= len(self._entries.pop(old_key))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "bytes": self._bytes}
+
+
+audio_cache = AudioCache()
+
+
+async def _synthesize(text: str) -> bytes:
+    """Collect edge-tts audio chunks for `text` in memory"""
+    communicate = edge_tts.Communicate(text, voice=AssistantVoice, **VOICE_SETTINGS)
+    audio = bytearray()
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio.extend(chunk["data"])
+    return bytes(audio)
+
+
+async def synthesize_cached(text: str, pin: bool = False) -> bytes:
+    key = AudioCache.key(text, AssistantVoice, VOICE_SETTINGS)
+    audio = audio_cache.get(key)
+    if audio is None:
+        with span("tts.synthesize"):
+            audio = await _synthesize(text)
+        audio_cache.put(key, audio, pin=pin)
+    return audio
+
+
+# Phrase bank: fixed phrases rendered once and spliced into responses
+_phrase_bank: List[str] = []
+_phrase_pattern: Optional["re.Pattern"] = None
+_SPEAKABLE = re.compile(r"\w")
+
+
+def prerender(phrases: Iterable[str]) -> int:
+    """Synthesise the fixed phrase bank (openers, closers, hotline, ...) up front"""
+    global _phrase_bank, _phrase_pattern
+    bank = sorted({p.strip() for p in list(phrases) + BANGLA_RESPONSES if p.strip()}, key=len, reverse=True)
+
+    async def render_all():
+        await asyncio.gather(*(synthesize_cached(phrase, pin=True) for phrase in bank))
+
+    asyncio.run(render_all())
+    _phrase_bank = bank
+    _phrase_pattern = re.compile("|".join(re.escape(p) for p in bank)) if bank else None
+    return len(bank)
+
+
+def split_segments(text: str) -> List[str]:
+    """Split text into phrase-bank segments and free text, in order"""
+    if _phrase_pattern is None:
+        return [text]
+    segments = []
+    position = 0
+    for match in _phrase_pattern.finditer(text):
+        segments.append(text[position:match.start()])
+        segments.append(match.group())
+        position = match.end()
+    segments.append(text[position:])
+    return [segment.strip() for segment in segments if _SPEAKABLE.search(segment)]
+
+
+async def synthesize_response(text: str) -> bytes:
+    """Concatenate cached phrase-bank audio with freshly synthesised segments"""
+    parts = await asyncio.gather(*(synthesize_cached(segment) for segment in split_segments(text)))
+    return b"".join(parts)
+
+
+# Playback
+class _SessionPlayback:
+    __slots__ = ("queue", "current", "channel", "timer")
+
+    def __init__(self):
+        self.queue = deque()
+        self.current = None
+        self.channel = None
+        self.timer = None
+
+
+class AudioPlayer:
+    """Plays in-memory MP3 audio through one long-lived pygame mixer.
+
+    Each session has its own queue, so concurrent users never overwrite each
+    other's audio. Completion is signalled through a threading.Event set by
+    a timer at the end of the clip, instead of polling get_busy().
+    """
+
+    def __init__(self, channels: int = PLAYER_CHANNELS):
+        self.channels = channels
+        self._sessions: Dict[str, _SessionPlayback] = {}
+        self._lock = threading.Lock()
+        self._mixer_ready = False
+
+    def _ensure_mixer(self) -> None:
+        if not self._mixer_ready:
             pygame.mixer.init()
-            pygame.mixer.music.load(r"Data\speech.mp3")
-            pygame.mixer.music.play()
+            pygame.mixer.set_num_channels(self.channels)
+            self._mixer_ready = True
+            atexit.register(self.close)
+
+    def play(self, audio: bytes, session_id: str = "default") -> threading.Event:
+        """Queue `audio` for `session_id`; the returned event is set once it has played"""
+        done = threading.Event()
+        if not audio:
+            done.set()
+            return done
+        with self._lock:
+            self._ensure_mixer()
+            sound = pygame.mixer.Sound(file=io.BytesIO(audio))
+            state = self._sessions.setdefault(session_id, _SessionPlayback())
+            state.queue.append((sound, done))
+            if state.current is None:
+                self._start_next(session_id, state)
+        return done
+
+    def _start_next(self, session_id: str, state: _SessionPlayback) -> None:
+        # Called with the lock held
+        if not state.queue:
+            state.current = state.channel = state.timer = None
+            del self._sessions[session_id]
+            return
+        sound, done = state.queue.popleft()
+        state.current = done
+        state.channel = pygame.mixer.find_channel(True)
+        state.channel.play(sound)
+        state.timer = threading.Timer(sound.get_length(), self._finished, (session_id, state, done))
+        state.timer.daemon = True
+        state.timer.start()
+
+    def _finished(self, session_id: str, state: _SessionPlayback, done: threading.Event) -> None:
+        with self._lock:
+            if state.current is not done:
+                return
+            done.set()
+            self._start_next(session_id, state)
+
+    def stop(self, session_id: str = "default") -> None:
+        """Stop the session's current clip and drop anything queued behind it"""
+        with self._lock:
+            state = self._sessions.pop(session_id, None)
+            if state is None:
+                return
+            if state.timer is not None:
+                state.timer.cancel()
+            if state.channel is not None:
+                state.channel.stop()
+            if state.current is not None:
+                state.current.set()
+            for _, done in state.queue:
+                done.set()
 
-            while pygame.mixer.music.get_busy():
+    def close(self) -> None:
+        with self._lock:
+            session_ids = list(self._sessions)
+        for session_id in session_ids:
+            self.stop(session_id)
+        if self._mixer_ready:
+            pygame.mixer.quit()
+            self._mixer_ready = False
+
+
+player = AudioPlayer()
+
+
+def TTS(text: str, callback: Optional[Callable] = None, session_id: str = "default") -> bool:
+    """Play text as speech with error handling; audio never touches the disk"""
+    try:
+        audio = asyncio.run(synthesize_response(text))
+        done = player.play(audio, session_id)
+
+        if callback is None:
+            done.wait()
+        else:
+            # A callback returning False interrupts playback
+            while not done.wait(0.1):
                 if callback() is False:
+                    player.stop(session_id)
                     break
-                pygame.time.Clock().tick(10)
-            return True
+        return True
 
-        except Exception as e:
-            print(f"TTS Error: {e}")
-            return False
-        finally:
+    except Exception as e:
+        print(f"TTS Error: {e}")
+        return False
+    finally:
+        if callback is not None:
             try:
                 callback(False)
-                pygame.mixer.music.stop()
-                pygame.mixer.quit()
             except Exception as e:
                 print(f"Cleanup Error: {e}")
 
 
-def TextToSpeech(text: str, callback: Optional[Callable] = lambda r=None: True) -> None:
+def TextToSpeech(text: str, callback: Optional[Callable] = None, session_id: str = "default") -> None:
     """Smart speech output with length handling"""
     if not text:
         return
@@ -78,11 +290,158 @@ def TextToSpeech(text: str, callback: Optional[Callable] = lambda r=None: True)
         brief_response = ". ".join(sentences[:2]) + "."
         notification = random.choice(BANGLA_RESPONSES)
         full_response = f"{brief_response} {notification}"
-        TTS(full_response, callback)
+        TTS(full_response, callback, session_id)
     else:
-        TTS(text, callback)
+        TTS(text, callback, session_id)
 
 
-def speak(text: str) -> None:
+def speak(text: str, session_id: str = "default") -> None:
     """Simplified interface for external use"""
-    TextToSpeech(text)
\ No newline at end of file
+    TextToSpeech(text, session_id=session_id)
+
+
+# Streaming speech output
+class SentenceSegmenter:
+    """Cuts a stream of text chunks into speakable sentences.
+
+    Never cuts inside a phrase-bank entry (CRISIS_REPLY, the breathing
+    technique, ...), even one still arriving, so split_segments() later
+    finds it whole and plays its pre-rendered audio.
+    """
+
+    _BOUNDARY = re.compile(r"[.!?؟\n]+\s*")
+
+    def __init__(self, min_chars: int = 20, phrases: Optional[Iterable[str]] = None):
+        self.min_chars = min_chars
+        self._buffer = ""
+        if phrases is None:
+            self._pattern = _phrase_pattern
+            phrases = _phrase_bank
+        else:
+            phrases = sorted({p.strip() for p in phrases if p.strip()}, key=len, reverse=True)
+            self._pattern = re.compile("|".join(re.escape(p) for p in phrases)) if phrases else None
+        # Only phrases with a boundary inside them can be cut in two
+        self._splittable = [p for p in phrases if self._BOUNDARY.search(p.rstrip(".!?؟ "))]
+
+    def _pending_phrase(self) -> int:
+        """Start of a phrase-bank entry the buffer ends part-way through (len(buffer) if none)"""
+        buffer = self._buffer
+        pending = len(buffer)
+        for phrase in self._splittable:
+            start = buffer.find(phrase[0], max(0, len(buffer) - len(phrase) + 1))
+            while start != -1 and start < pending:
+                if phrase.startswith(buffer[start:]):
+                    pending = start
+                    break
+                start = buffer.find(phrase[0], start + 1)
+        return pending
+
+    def feed(self, text: str) -> List[str]:
+        """Add text and return every sentence completed by it"""
+        self._buffer += text
+        phrases = [m.span() for m in self._pattern.finditer(self._buffer)] if self._pattern else []
+        pending = self._pending_phrase() if self._splittable else len(self._buffer)
+        sentences = []
+        start = 0
+        for match in self._BOUNDARY.finditer(self._buffer):
+            if match.end() > pending:
+                break
+            if any(begin < match.end() < end for begin, end in phrases):
+                continue
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return whatever is left once the text stream has ended"""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+class StreamingSpeaker:
+    """Synthesises sentences as they complete and plays them back in order.
+
+    Synthesis of the next sentence overlaps playback of the current one, so
+    audio starts after the first sentence instead of after the whole reply.
+    """
+
+    _DONE = object()
+
+    def __init__(self, started_at: Optional[float] = None, session_id: str = "default"):
+        self.session_id = session_id
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.time_to_first_audio: Optional[float] = None
+        self._segmenter = SentenceSegmenter()
+        self._sentences: "queue.Queue" = queue.Queue()
+        self._audio: "queue.Queue" = queue.Queue()
+        # Each thread runs in a copy of the caller's context so its spans keep the turn id
+        self._synth_thread = threading.Thread(
+            target=contextvars.copy_context().run, args=(self._synthesis_loop,), daemon=True
+        )
+        self._play_thread = threading.Thread(
+            target=contextvars.copy_context().run, args=(self._playback_loop,), daemon=True
+        )
+        self._synth_thread.start()
+        self._play_thread.start()
+
+    def feed(self, text: str) -> None:
+        for sentence in self._segmenter.feed(text):
+            self._sentences.put(sentence)
+
+    def finish(self) -> None:
+        """Mark the end of the text stream"""
+        for sentence in self._segmenter.flush():
+            self._sentences.put(sentence)
+        self._sentences.put(self._DONE)
+
+    def wait(self) -> Optional[float]:
+        """Block until every sentence has been played; returns time-to-first-audio"""
+        self._synth_thread.join()
+        self._play_thread.join()
+        return self.time_to_first_audio
+
+    def _synthesis_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                sentence = self._sentences.get()
+                if sentence is self._DONE:
+                    break
+                try:
+                    self._audio.put(loop.run_until_complete(synthesize_response(sentence)))
+                except Exception as e:
+                    print(f"TTS Error: {e}")
+        finally:
+            loop.close()
+            self._audio.put(self._DONE)
+
+    def _playback_loop(self) -> None:
+        try:
+            while True:
+                audio = self._audio.get()
+                if audio is self._DONE:
+                    break
+                if not audio:
+                    continue
+                done = player.play(audio, self.session_id)
+                playing = time.perf_counter()
+                if self.time_to_first_audio is None:
+                    self.time_to_first_audio = playing - self.started_at
+                    get_histogram("turn.time_to_first_audio").observe(self.time_to_first_audio)
+                done.wait()
+                record("tts.playback", time.perf_counter() - playing, started=playing)
+        except Exception as e:
+            print(f"Playback Error: {e}")
+
+
+def speak_stream(chunks: Iterable[str], started_at: Optional[float] = None,
+                 session_id: str = "default") -> Optional[float]:
+    """Speak text while it is still being generated; returns time-to-first-audio"""
+    speaker = StreamingSpeaker(started_at, session_id)
+    for chunk in chunks:
+        speaker.feed(chunk)
+    speaker.finish()
+    return speaker.wait()
@@ -0,0 +1,186 @@
+"""Reply validation: is the answer spoken-style Omani counselling?
+
+The original check asked Gemini four yes/no questions on every turn
+(natural conversation, Omani expressions, practical advice woven in, no
+academic structure). RuleValidator answers the same questions locally in
+well under a millisecond; EscalatingValidator only asks Gemini when the
+local score falls between the accept and reject thresholds.
+
+The local rules judge the model's draft: its own text, before academic
+markers are stripped, the dialect rewrite and the inserted phrases. The
+rewrite turns plain MSA into dialect markers (حاول -> جرب, القلب ->
+الفؤاد), so scoring its output would pass any MSA reply. Gemini still
+sees the reply as it will be spoken.
+
+    VALIDATOR=hybrid   local rules, Gemini for the uncertain middle (default)
+    VALIDATOR=local    local rules only, never a network call
+    VALIDATOR=gemini   the old behaviour
+"""
+import os
+import re
+from typing import Callable, Iterable, Optional
+
+from arabic_text import PhraseMatcher, load_lexicon, normalize_arabic
+from metrics import get_histogram
+
+VALIDATOR = os.getenv("VALIDATOR", "hybrid")  # hybrid | local | gemini
+VALIDATOR_ACCEPT = float(os.getenv("VALIDATOR_ACCEPT", 0.75))  # Local score at or above: valid
+VALIDATOR_REJECT = float(os.getenv("VALIDATOR_REJECT", 0.35))  # Local score at or below: invalid
+VALIDATOR_MIN_WORDS = int(os.getenv("VALIDATOR_MIN_WORDS", 12))
+VALIDATOR_MAX_WORDS = int(os.getenv("VALIDATOR_MAX_WORDS", 250))  # Longer is a lecture, not a spoken reply
+VALIDATOR_CLASSIFIER_PATH = os.getenv("VALIDATOR_CLASSIFIER_PATH")  # Optional joblib text classifier
+VALIDATOR_MARKERS_PATH = os.getenv(
+    "VALIDATOR_MARKERS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons", "omani_markers.txt")
+)
+
+# Verbs and phrases that carry a concrete suggestion
+ADVICE_MARKERS = [
+    "جرب", "جربي", "حاول", "حاولي", "خذ", "خذي", "خد", "خدي", "اكتب", "اكتبي", "امش", "تمشى",
+    "تنفس", "نفس عميق", "صل", "صلي", "اذكر", "ذكر الله", "دعاء", "ادع", "كلم", "كلمي", "نام", "رتب",
+    "خطوة", "try", "take a", "write down", "breathe", "talk to",
+]
+# Lecture structure the prompt asks the model to avoid
+ACADEMIC_MARKERS = [
+    "أولاً", "ثانياً", "ثالثاً", "الخلاصة", "المقدمة", "في الختام", "النقاط التالية",
+    "firstly", "secondly", "in conclusion",
+]
+_MARKDOWN = re.compile(r"\*\*|^\s*#+\s", re.MULTILINE)
+_LIST_ITEM = re.compile(r"^\s*(?:[-*•◦▪]|\(?[0-9٠-٩]+[.)\-]|[0-9٠-٩]+\s*-)\s*", re.MULTILINE)
+_WORD = re.compile(r"\w+")
+_AFFIRMATIVE = {normalize_arabic(word) for word in ("نعم", "yes")}
+
+
+def is_affirmative(answer: str) -> bool:
+    """True only when the LLM's answer starts with yes ("نعم ..."), not when the word appears anywhere"""
+    match = _WORD.search(answer or "")
+    return bool(match) and normalize_arabic(match.group()) in _AFFIRMATIVE
+
+
+class ResponseValidator:
+    """Decides whether a post-processed reply may be spoken as is.
+
+    `draft` is the LLM text before post-processing (None: judge `response`).
+    """
+
+    name = "base"
+
+    def validate(self, query: str, response: str, draft: Optional[str] = None) -> bool:
+        raise NotImplementedError
+
+    def decide_locally(self, query: str, response: str, draft: Optional[str] = None) -> Optional[bool]:
+        """The decision if it needs no remote call, None otherwise"""
+        return None
+
+
+class RuleValidator(ResponseValidator):
+    """The four criteria as local checks, blended into a score in [0, 1].
+
+    Lists/numbering or a length outside the bounds fail outright. Otherwise
+    the score weighs Omani dialect markers, a practical suggestion and the
+    absence of lecture structure. Only the model's own text is judged: the
+    draft when given, otherwise the reply with the post-processor's inserted
+    phrases (openers, particles) removed.
+    """
+
+    name = "local"
+
+    def __init__(self, ignore: Iterable[str] = (), markers_path: str = VALIDATOR_MARKERS_PATH,
+                 accept: float = VALIDATOR_ACCEPT, min_words: int = VALIDATOR_MIN_WORDS,
+                 max_words: int = VALIDATOR_MAX_WORDS, classifier_path: Optional[str] = VALIDATOR_CLASSIFIER_PATH):
+        self.ignore = sorted({phrase.strip() for phrase in ignore if phrase.strip()}, key=len, reverse=True)
+        self.dialect = PhraseMatcher(load_lexicon(markers_path), word_boundaries=True)
+        self.advice = PhraseMatcher(ADVICE_MARKERS, word_boundaries=True)
+        self.academic = PhraseMatcher(ACADEMIC_MARKERS, word_boundaries=True)
+        self.accept = accept
+        self.min_words = min_words
+        self.max_words = max_words
+        self.classifier = _load_classifier(classifier_path) if classifier_path else None
+
+    def _body(self, response: str) -> str:
+        for phrase in self.ignore:
+            response = response.replace(phrase, " ")
+        return response
+
+    def score(self, query: str, response: str, draft: Optional[str] = None) -> float:
+        body = draft if draft is not None else self._body(response)
+        words = len(_WORD.findall(body))
+        if not self.min_words <= words <= self.max_words or len(_LIST_ITEM.findall(body)) >= 2:
+            return 0.0
+
+        normalized = normalize_arabic(body)
+        dialect = min(1.0, len({p for _, _, p in self.dialect.find_all(normalized, normalized=True)}) / 2)
+        advice = 1.0 if self.advice.find_all(normalized, normalized=True) else 0.0
+        natural = 0.0 if _MARKDOWN.search(body) or self.academic.find_all(normalized, normalized=True) else 1.0
+        score = 0.4 * dialect + 0.3 * advice + 0.3 * natural
+        if self.classifier is not None:
+            score = (score + float(self.classifier.predict_proba([body])[0][1])) / 2
+        return score
+
+    def validate(self, query: str, response: str, draft: Optional[str] = None) -> bool:
+        return self.score(query, response, draft) >= self.accept
+
+    def decide_locally(self, query: str, response: str, draft: Optional[str] = None) -> Optional[bool]:
+        return self.validate(query, response, draft)
+
+
+class RemoteValidator(ResponseValidator):
+    """An LLM judge; `ask(query, response)` returns its raw answer"""
+
+    name = "gemini"
+
+    def __init__(self, ask: Callable[[str, str], str]):
+        self.ask = ask
+
+    def validate(self, query: str, response: str, draft: Optional[str] = None) -> bool:
+        return is_affirmative(self.ask(query, response))
+
+
+class EscalatingValidator(ResponseValidator):
+    """Local score decides clear cases; the remote judge settles the rest"""
+
+    name = "hybrid"
+
+    def __init__(self, local: RuleValidator, remote: ResponseValidator,
+                 accept: float = VALIDATOR_ACCEPT, reject: float = VALIDATOR_REJECT):
+        self.local = local
+        self.remote = remote
+        self.accept = accept
+        self.reject = reject
+        self._escalated = get_histogram("validator.escalated")
+
+    def decide_locally(self, query: str, response: str, draft: Optional[str] = None) -> Optional[bool]:
+        score = self.local.score(query, response, draft)
+        if score >= self.accept:
+            return True
+        if score <= self.reject:
+            return False
+        return None
+
+    def validate(self, query: str, response: str, draft: Optional[str] = None) -> bool:
+        decision = self.decide_locally(query, response, draft)
+        self._escalated.observe(decision is None)
+        if decision is not None:
+            return decision
+        return self.remote.validate(query, response, draft)
+
+
+def _load_classifier(path: str):
+    """A scikit-learn text pipeline (predict_proba on raw strings) saved with joblib"""
+    try:
+        import joblib
+    except ImportError:
+        print("joblib not installed - validator runs on rules only")
+        return None
+    return joblib.load(path)
+
+
+def build_validator(kind: str, ask: Callable[[str, str], str], ignore: Iterable[str] = ()) -> ResponseValidator:
+    if kind == "gemini":
+        return RemoteValidator(ask)
+    local = RuleValidator(ignore)
+    if kind == "local":
+        return local
+    if kind == "hybrid":
+        return EscalatingValidator(local, RemoteValidator(ask))
+    raise ValueError(f"Unknown VALIDATOR: {kind} (expected hybrid, local or gemini)")